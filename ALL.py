@@ -1,15 +1,16 @@
 # coding:utf-8
 import os
-import time
+import sys
 
+import compact_archive
+import crawler
+import history_store
+import ingest_profile
 import main
 import post_to_redis
-import sys
 
-
-# work_list = [
-#     "de-DE", "en-CA", "en-GB", "en-IN", "en-US", "fr-FR", "it-IT", "ja-JP", "zh-CN"
-# ]
+# HPImageArchive 的 idx 最大为 7，每页最多 8 张，合起来约覆盖最近 15 天
+BACKFILL_MAX_IDX = 7
 
 
 # 判断文件是否存在
@@ -24,32 +25,178 @@ def dir_exists(dir_path):
 
 def get_all_template():
     # 读取 data/template_all.json 文件
-    with open("data/template_all.json", "r") as f:
+    with open(os.path.join(history_store.DATA_DIR, "template_all.json"), "r") as f:
         template_all = f.read()
     return template_all
 
 
 def get_update_template():
     # 读取 data/template_update.json 文件
-    with open("data/template_update.json", "r") as _f:
+    with open(os.path.join(history_store.DATA_DIR, "template_update.json"), "r") as _f:
         template_update = _f.read()
     return template_update
 
 
-i = sys.argv[1]
+def init_region(i):
+    """初始化地区的数据文件和目录"""
+    all_json = os.path.join(history_store.DATA_DIR, f"{i}_all.json")
+    update_json = os.path.join(history_store.DATA_DIR, f"{i}_update.json")
+    daily_log = os.path.join(history_store.DATA_DIR, f"{i}_daily_log")
+    if not file_exists(all_json):
+        # 创建文件
+        with open(all_json, "w", encoding="utf-8") as f:
+            f.write(get_all_template())
+    if not file_exists(update_json):
+        # 创建文件
+        with open(update_json, "w", encoding="utf-8") as f:
+            f.write(get_update_template())
+    if not dir_exists(daily_log):
+        # 创建文件夹
+        os.mkdir(daily_log)
+
+
+def export_views(i, force=False):
+    """
+    有新记录追加时导出 {i}_all.json（通常是增量的）和 {i}_archive.bin，没有新记录时跳过
+
+    :param force: 全量导出（--export，或补抓了可能早于已导出记录的历史）
+    """
+    images = None
+    if force or history_store.export_due(i, 'all_json', history_store.all_json_path(i)):
+        with ingest_profile.stage('all_json_export', i):
+            images = history_store.export_all_json(i, full=force)
+    if force or history_store.export_due(i, 'archive', compact_archive.archive_path(i)):
+        with ingest_profile.stage('archive_export', i):
+            compact_archive.export_archive(i, images)
+
+
+def run(markets, export=False):
+    """
+    并发抓取所有地区，然后依次写入文件并共用一个 Redis 连接发布
+
+    :param export: 全量导出 {region}_all.json 和 {region}_archive.bin（默认有新记录时增量导出）
+    """
+    with ingest_profile.stage('http_fetch'):
+        results = crawler.fetch_markets(markets)
+    failed = [i for i in markets if isinstance(results[i], Exception)]
+    r = None
+    try:
+        for i in markets:
+            if i in failed:
+                continue
+            try:
+                init_region(i)
+                main.main(i, results[i])
+                export_views(i, export)
+                if r is None:
+                    with ingest_profile.stage('redis_connect'):
+                        r = post_to_redis.get_redis_connection()
+                post_to_redis.main(i, r)
+            except Exception as e:
+                print("[{}] ❌ 处理 {} 失败: {}".format(main.get_now_time(), i, e))
+                failed.append(i)
+    finally:
+        if r is not None:
+            r.close()
+    return failed
+
+
+def backfill(markets, max_idx=BACKFILL_MAX_IDX, n=8, base_url=crawler.BING_ARCHIVE_URL, r=None):
+    """
+    补抓历史：并发请求所有地区的多页（idx 0..max_idx），每个地区按 startdate 合并后一次写入历史存储，
+    最后用一个 Redis 连接一次发布所有地区的新图片。用于新增地区或补上漏跑的日期
+
+    不写 daily_log 和 {region}_update.json（它们只记录每日运行的原始响应）
+
+    :param base_url: HPImageArchive 地址，可以指向录制响应的本地替身（bench/archive_server.py）
+    :param r: 复用的 Redis 连接，为空时自行创建
+    :return: ({地区: 新图片数量}, 失败的地区)
+    """
+    with ingest_profile.stage('http_fetch'):
+        pages = crawler.fetch_pages(markets, crawler.backfill_offsets(max_idx, n), n, base_url)
+    counts = {}
+    failed = []
+    new_images = {}
+    for i in markets:
+        fetched = [(idx, data) for idx, data in pages[i] if not isinstance(data, Exception)]
+        if len(fetched) != len(pages[i]):
+            # 部分页失败时仍写入已取到的图片，再次运行会补上其余的
+            failed.append(i)
+        if not fetched:
+            continue
+        try:
+            init_region(i)
+            with ingest_profile.stage('merge_pages', i):
+                merged = main.merge_pages(fetched)
+            stored = main.store_new_images(i, merged)
+            if stored:
+                # 补抓的记录可能早于上次导出的最新日期，export_all_json 会自动退回全量导出
+                export_views(i)
+            counts[i] = len(stored)
+            if stored:
+                new_images[i] = stored
+        except Exception as e:
+            print("[{}] ❌ 补抓 {} 失败: {}".format(main.get_now_time(), i, e))
+            if i not in failed:
+                failed.append(i)
+
+    if new_images:
+        own_connection = r is None
+        if own_connection:
+            with ingest_profile.stage('redis_connect'):
+                r = post_to_redis.get_redis_connection()
+        try:
+            with ingest_profile.stage('redis_publish'):
+                added_count, existing_count, error_count = post_to_redis.publish_images(
+                    r, [item for stored in new_images.values() for item in stored])
+            print("[{}] 补抓发布完成: 成功 {} 张, 已存在 {} 张, 失败 {} 张".format(
+                main.get_now_time(), added_count, existing_count, error_count))
+            for i, stored in new_images.items():
+                with ingest_profile.stage('redis_index', i):
+                    indexed_count, index_error_count = post_to_redis.index_images(r, i, stored)
+                print("[{}] {} 日期和搜索索引新增 {} 张, 失败 {} 张".format(
+                    main.get_now_time(), i, indexed_count, index_error_count))
+            with ingest_profile.stage('redis_schedule'):
+                post_to_redis.schedule_today_wallpapers(r)
+        finally:
+            if own_connection:
+                r.close()
+    print("[{}] 补抓完成: {}".format(
+        main.get_now_time(), ", ".join("{} {} 张".format(i, count) for i, count in counts.items()) or "没有新图片"))
+    return counts, failed
+
+
+def parse_markets(args):
+    if not args or args == ["all"]:
+        return crawler.WORK_LIST
+    return args
 
-if not file_exists(f"data/{i}_all.json"):
-    # 创建文件
-    with open(f"data/{i}_all.json", "w", encoding="utf-8") as f:
-        f.write(get_all_template())
-if not file_exists(f"data/{i}_update.json"):
-    # 创建文件
-    with open(f"data/{i}_update.json", "w", encoding="utf-8") as f:
-        f.write(get_update_template())
-if not dir_exists(f"data/{i}_daily_log"):
-    # 创建文件夹
-    os.mkdir(f"data/{i}_daily_log")
-main.main(i)
-post_to_redis.main(i)
-time.sleep(3)
 
+if __name__ == "__main__":
+    # 用法: python ALL.py zh-CN en-US ...，或 python ALL.py all 处理全部地区
+    #       python ALL.py backfill zh-CN en-US ... [--max-idx 7] [--base-url URL]
+    #       加 --profile（或 INGEST_PROFILE=true）统计各阶段耗时，见 ingest_profile.py
+    #       加 --export 全量（而不是增量）导出 {region}_all.json 和 {region}_archive.bin
+    args = sys.argv[1:]
+    profiling = ingest_profile.is_requested(args)
+    export_arg = '--export' in args
+    args = [arg for arg in args if arg not in ('--profile', '--export')]
+    if profiling:
+        ingest_profile.start()
+    mode = "backfill" if args and args[0] == "backfill" else "daily"
+    if mode == "backfill":
+        args = args[1:]
+        options = {}
+        for name, key, cast in (('--max-idx', 'max_idx', int), ('--base-url', 'base_url', str)):
+            if name in args:
+                pos = args.index(name)
+                options[key] = cast(args[pos + 1])
+                del args[pos:pos + 2]
+        _, failed_list = backfill(parse_markets(args), **options)
+    else:
+        failed_list = run(parse_markets(args), export_arg)
+    if profiling:
+        ingest_profile.finish(mode=mode, regions=parse_markets(args), failed=failed_list)
+    if failed_list:
+        print("[{}] 以下地区处理失败: {}".format(main.get_now_time(), ", ".join(failed_list)))
+        sys.exit(1)
@@ -0,0 +1,746 @@
+# api/_app.py
+# 图片 API 的路由逻辑（异步），由 api/images.py、api/index.py 和根目录的 asgi.py 共用
+import asyncio
+import hashlib
+import json
+import os
+import random
+import urllib.parse
+from collections import deque
+from datetime import datetime
+
+import _dates
+import _search
+import _timing
+import wallpaper_index
+from _cache import cached, get_data_version
+from _redis_pool import get_async_redis_client
+
+# 定义域名
+DOMAIN = "https://wallpaper.virola.me"
+
+# 由 post_to_redis 维护、按 startdate 排序的壁纸索引（ZSET），所有列表、位置、随机和今日壁纸都从这里读取
+WALLPAPER_INDEX = wallpaper_index.WALLPAPER_INDEX
+# 外部导入的旧集合：wallpapers:index 为空（尚未运行 post_to_redis.py backfill）时所有列表都退回到这里
+LEGACY_WALLPAPERS = "wallpapers"
+# sort 参数：date（旧 -> 新，默认）、reverse（新 -> 旧）、alphabetical（按地址字母序）、random
+SORT_OPTIONS = ('date', 'reverse', 'alphabetical', 'random')
+# /api/images* 的接口路径：完整匹配的路径和带参数的路径前缀，其余路径直接返回 404
+ROUTE_PATHS = ('/api/images', '/api/images/', '/api/images/search', '/api/images/date',
+               '/api/images/latest', '/api/images/today')
+ROUTE_PREFIXES = ('/api/images/date/', '/api/images/position/')
+# 分页参数：默认每页数量、单页最大数量，以及流式输出时每批从 Redis 读取的数量
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 1000
+STREAM_BATCH_SIZE = 500
+# 各接口的缓存策略：浏览器每次都用 ETag 重新验证，CDN 按 s-maxage 缓存
+CACHE_CONTROL_LIST = 'public, max-age=0, s-maxage=300, stale-while-revalidate=3600'
+CACHE_CONTROL_TODAY = 'public, max-age=0, s-maxage=3600, stale-while-revalidate=600'
+CACHE_CONTROL_RANDOM = 'no-store'
+CACHE_CONTROL_REDIRECT = 'max-age=0, s-maxage=86400, stale-while-revalidate=3600'  # 缓存24小时
+HOME_PAGE_CACHE_CONTROL = 'public, max-age=3600, s-maxage=86400'
+
+# 读取今日壁纸，不存在时从 wallpapers:index（为空时从旧的 wallpapers 集合）随机选一张并 SET NX，整个过程在服务端原子执行
+TODAY_WALLPAPER_SCRIPT = """
+local today = redis.call('GET', KEYS[1])
+if today then
+    return today
+end
+local member = redis.call('ZRANDMEMBER', KEYS[2])
+if not member then
+    member = redis.call('SRANDMEMBER', KEYS[3])
+end
+if not member then
+    return false
+end
+redis.call('SET', KEYS[1], member, 'EX', ARGV[1], 'NX')
+return redis.call('GET', KEYS[1])
+"""
+
+# 随机取一张图片，一次往返：wallpapers:index 中是入库时算好的 4K 地址，索引为空时退回旧的 wallpapers 集合
+RANDOM_IMAGE_SCRIPT = """
+local member = redis.call('ZRANDMEMBER', KEYS[1])
+if not member then
+    member = redis.call('SRANDMEMBER', KEYS[2])
+end
+return member or false
+"""
+
+# 按日期范围查询：ZCOUNT + ZRANGEBYSCORE ... LIMIT 取出当前页的 id，再 HMGET 元数据，
+# 一次往返，耗时 O(log N + k)。返回 {总数, 元数据...}
+DATE_RANGE_SCRIPT = """
+local total = redis.call('ZCOUNT', KEYS[1], ARGV[1], ARGV[2])
+local ids
+if ARGV[5] == 'reverse' then
+    ids = redis.call('ZREVRANGEBYSCORE', KEYS[1], ARGV[2], ARGV[1], 'LIMIT', ARGV[3], ARGV[4])
+else
+    ids = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], ARGV[2], 'LIMIT', ARGV[3], ARGV[4])
+end
+local result = {total}
+if #ids > 0 then
+    local metas = redis.call('HMGET', KEYS[2], unpack(ids))
+    for i = 1, #metas do
+        if metas[i] then
+            result[#result + 1] = metas[i]
+        end
+    end
+end
+return result
+"""
+
+# 本地预取的随机图片池大小，0 表示关闭；池中剩余不足一半时在后台补充
+RANDOM_POOL_SIZE = int(os.environ.get('RANDOM_POOL_SIZE', '0'))
+
+_scripts = {}
+_random_pool = deque()
+_refill_task = None
+
+
+class Response:
+    """与传输方式无关的响应：body 为 bytes，或 stream 为逐块产出 bytes 的异步迭代器"""
+
+    def __init__(self, status, headers=None, body=b'', stream=None):
+        self.status = status
+        self.headers = headers or []
+        self.body = body
+        self.stream = stream
+
+
+def get_now_time():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_script(r, source):
+    """注册 Lua 脚本（只计算一次 SHA），之后调用时走 EVALSHA"""
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = r.register_script(source)
+    return script
+
+
+def parse_query_params(path):
+    """解析查询参数"""
+    if '?' in path:
+        path, query = path.split('?', 1)
+        params = urllib.parse.parse_qs(query)
+        return path, {k: v[0] for k, v in params.items()}
+    return path, {}
+
+
+def json_response(data, status_code=200, extra_headers=None):
+    """JSON响应"""
+    headers = [
+        ('Content-type', 'application/json'),
+        ('Access-Control-Allow-Origin', '*'),
+    ]
+    headers.extend(extra_headers or [])
+    with _timing.stage('json'):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return Response(status_code, headers, body)
+
+
+def redirect_response(url):
+    """URL 重定向，使用 308 永久重定向，便于缓存"""
+    return Response(308, [
+        ('Access-Control-Allow-Origin', '*'),
+        ('Location', url),
+        ('Cache-Control', CACHE_CONTROL_REDIRECT),
+        ('Content-type', 'text/plain'),
+    ], 'Redirecting to {} (308)'.format(url).encode('utf-8'))
+
+
+def etag_matches(headers, etag):
+    """If-None-Match 是否与 etag 匹配（headers 的键为小写）"""
+    if_none_match = headers.get('if-none-match')
+    if not if_none_match or not etag:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+
+class ImagesRequest:
+    """处理一次 /api/images* 请求"""
+
+    def __init__(self, r, headers):
+        self.r = r
+        self.headers = headers
+        # 当前请求成功响应时附带的 ETag / Cache-Control
+        self.response_etag = None
+        self.response_cache_control = None
+
+    def validators(self):
+        headers = []
+        if self.response_etag:
+            headers.append(('ETag', self.response_etag))
+        if self.response_cache_control:
+            headers.append(('Cache-Control', self.response_cache_control))
+        return headers
+
+    def json_response(self, data, status_code=200):
+        return json_response(data, status_code, self.validators() if status_code == 200 else None)
+
+    async def make_etag(self, *parts):
+        """由数据版本和请求内容生成强 ETag，数据版本变化后自动失效"""
+        version = await get_data_version(self.r)
+        raw = "\0".join(str(part) for part in (version,) + parts)
+        return '"{}"'.format(hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20])
+
+    async def use_legacy(self):
+        """wallpapers:index 为空时退回旧的 wallpapers 集合（进程内缓存，数据版本变化后重新判断）"""
+        return await cached(self.r, ('legacy',), self.index_is_empty)
+
+    async def index_is_empty(self):
+        return await self.r.zcard(WALLPAPER_INDEX) == 0
+
+    async def from_list(self, sort_by):
+        """是否要读取完整列表后在进程内排序：字母序、随机，以及退回旧集合时"""
+        return sort_by in ('alphabetical', 'random') or await self.use_legacy()
+
+    async def get_sorted_images(self, sort_by='date'):
+        """获取排序后的图片列表（进程内缓存，数据版本变化或过期后重新读取）"""
+        if sort_by == 'random':
+            # 缓存按日期排列的列表，每次打乱一份副本
+            images = list(await cached(self.r, ('sorted', 'date'), lambda: self.load_sorted_images('date')))
+            random.shuffle(images)
+            return images
+        return await cached(self.r, ('sorted', sort_by), lambda: self.load_sorted_images(sort_by))
+
+    async def load_sorted_images(self, sort_by='date'):
+        """
+        从 wallpapers:index 读取按日期排列的图片列表，alphabetical 时按地址排序；
+        退回旧的 wallpapers 集合时没有日期，date 与 alphabetical 相同
+        """
+        if await self.use_legacy():
+            images = sorted(await self.r.smembers(LEGACY_WALLPAPERS))
+        else:
+            images = await self.r.zrange(WALLPAPER_INDEX, 0, -1)
+            if sort_by == 'alphabetical':
+                images.sort()
+        if sort_by == 'reverse':
+            images.reverse()
+        return images
+
+    async def read_index_range(self, sort_by, start, stop):
+        """一次往返（ZCARD + ZRANGE 管道）读取索引的一段，返回 [总数, 成员列表]"""
+        pipe = self.r.pipeline(transaction=False)
+        pipe.zcard(WALLPAPER_INDEX)
+        if sort_by == 'reverse':
+            pipe.zrevrange(WALLPAPER_INDEX, start, stop)
+        else:
+            pipe.zrange(WALLPAPER_INDEX, start, stop)
+        return await pipe.execute()
+
+    async def get_image_at(self, position, sort_by='date'):
+        """
+        通过 wallpapers:index 获取指定位置的图片（random 时从打乱的列表中取）
+
+        :return: (图片或 None, 总数, 规范化后的位置)
+        """
+        if await self.from_list(sort_by):
+            images_list = await self.get_sorted_images(sort_by)
+            total = len(images_list)
+            if position < 0:
+                position = total + position
+            return (images_list[position] if 0 <= position < total else None), total, position
+        total, members = await cached(
+            self.r, ('position', sort_by, position),
+            lambda: self.read_index_range(sort_by, position, position)
+        )
+        # 支持负数索引，比如 -1 表示最后一个
+        if position < 0:
+            position = total + position
+        return (members[0] if members else None), total, position
+
+    async def get_page(self, sort_by, offset, limit):
+        """
+        获取一页图片
+
+        :return: (图片列表, 总数)；一次 ZCARD + ZRANGE（random 时为 ZRANDMEMBER）管道往返
+        """
+        legacy = await self.use_legacy()
+        if sort_by == 'random':
+            pipe = self.r.pipeline(transaction=False)
+            if legacy:
+                pipe.scard(LEGACY_WALLPAPERS)
+                pipe.srandmember(LEGACY_WALLPAPERS, limit)
+            else:
+                pipe.zcard(WALLPAPER_INDEX)
+                pipe.zrandmember(WALLPAPER_INDEX, limit)
+            total, images = await pipe.execute()
+            return images or [], total
+        if legacy or sort_by == 'alphabetical':
+            images = await self.get_sorted_images(sort_by)
+            return images[offset:offset + limit], len(images)
+        total, images = await cached(
+            self.r, ('page', sort_by, offset, limit),
+            lambda: self.read_index_range(sort_by, offset, offset + limit - 1)
+        )
+        return images, total
+
+    async def search(self, query, market, offset, limit):
+        """
+        在标题和版权信息中搜索（所有词都要出现），结果按数据版本缓存
+
+        :return: (当前页的图片元数据, 命中总数)
+        """
+        tokens = wallpaper_index.tokenize(query, query=True)
+        return await cached(self.r, ('search', tuple(tokens), market, offset, limit),
+                            lambda: _search.search(self.r, tokens, market, offset, limit))
+
+    async def get_date_range(self, market, start, end, offset, limit, sort_by='date'):
+        """
+        按 startdate 范围读取一个地区（market 为空时所有地区）的图片，结果按数据版本缓存
+
+        :param start: 起始日期 YYYYMMDD（含），None 表示不限
+        :param end: 结束日期 YYYYMMDD（含），None 表示不限
+        :return: (当前页的图片元数据, 范围内总数)
+        """
+        async def load():
+            script = get_script(self.r, DATE_RANGE_SCRIPT)
+            total, *metas = await script(
+                keys=[wallpaper_index.date_index_key(market), wallpaper_index.IMAGE_META],
+                args=[start or '-inf', end or '+inf', offset, limit, sort_by],
+                client=self.r,
+            )
+            return [json.loads(meta) for meta in metas], total
+
+        return await cached(self.r, ('date', market, start, end, offset, limit, sort_by), load)
+
+    async def get_cursor_page(self, cursor, limit):
+        """基于 ZSCAN 的游标分页（不保证顺序），返回 (图片列表, 下一个游标)，游标为 0 表示结束"""
+        if await self.use_legacy():
+            next_cursor, members = await self.r.sscan(LEGACY_WALLPAPERS, cursor, count=limit)
+            return members, next_cursor
+        next_cursor, members = await self.r.zscan(WALLPAPER_INDEX, cursor, count=limit)
+        return [member for member, _ in members], next_cursor
+
+    async def iter_images(self, sort_by, offset=0, limit=None):
+        """按排序分批遍历图片，用于流式输出，每批最多 STREAM_BATCH_SIZE 张"""
+        r = self.r
+        end = offset + limit if limit is not None else None
+        if not await self.from_list(sort_by):
+            read_range = r.zrevrange if sort_by == 'reverse' else r.zrange
+            start = offset
+            while end is None or start < end:
+                stop = start + STREAM_BATCH_SIZE - 1
+                if end is not None:
+                    stop = min(stop, end - 1)
+                batch = await read_range(WALLPAPER_INDEX, start, stop)
+                if not batch:
+                    break
+                yield batch
+                start += len(batch)
+        else:
+            images = (await self.get_sorted_images(sort_by))[offset:end]
+            for start in range(0, len(images), STREAM_BATCH_SIZE):
+                yield images[start:start + STREAM_BATCH_SIZE]
+
+    def ndjson_response(self, batches):
+        """以 NDJSON 流式输出，每行一张图片，边读边写，不在内存中拼接完整响应"""
+        async def stream():
+            async for batch in batches:
+                yield "".join(json.dumps(image, ensure_ascii=False) + "\n" for image in batch).encode('utf-8')
+
+        headers = [
+            ('Content-type', 'application/x-ndjson; charset=utf-8'),
+            ('Access-Control-Allow-Origin', '*'),
+        ]
+        return Response(200, headers + self.validators(), stream=stream())
+
+    async def get_today_wallpaper(self):
+        """
+        获取今日壁纸：通常已由 post_to_redis 提前写入，一次 GET 即可；
+        未写入时由 Lua 脚本原子地选出并缓存，并发请求拿到的是同一张
+        """
+        # 使用今天的日期作为key
+        today_key = f"wallpaper:today:{datetime.now().strftime('%Y-%m-%d')}"
+        # 缓存24小时
+        script = get_script(self.r, TODAY_WALLPAPER_SCRIPT)
+        return await script(keys=[today_key, WALLPAPER_INDEX, LEGACY_WALLPAPERS], args=[86400], client=self.r)
+
+    async def handle(self, raw_path):
+        try:
+            return await self.route(raw_path)
+        except Exception as e:
+            return json_response(
+                {"status": "error", "message": f"服务器错误: {str(e)}"},
+                500
+            )
+
+    async def route(self, raw_path):
+        path, params = parse_query_params(raw_path)
+        sort_by = params.get('sort') if params.get('sort') in SORT_OPTIONS else 'date'
+        response_format = params.get('format', 'json')  # 默认json格式
+
+        # 先匹配路由，未知路径不读取数据版本
+        if path not in ROUTE_PATHS and not path.startswith(ROUTE_PREFIXES):
+            return json_response({"status": "error", "message": "接口不存在"}, 404)
+
+        # 条件请求：结果只取决于数据版本（today 还取决于日期），random 每次不同
+        if response_format != 'image':
+            if sort_by == 'random':
+                self.response_cache_control = CACHE_CONTROL_RANDOM
+            elif path == '/api/images/today':
+                self.response_cache_control = CACHE_CONTROL_TODAY
+                self.response_etag = await self.make_etag(raw_path, datetime.now().strftime('%Y-%m-%d'))
+            else:
+                self.response_cache_control = CACHE_CONTROL_LIST
+                self.response_etag = await self.make_etag(raw_path)
+            if etag_matches(self.headers, self.response_etag):
+                return Response(304, [('Access-Control-Allow-Origin', '*')] + self.validators())
+
+        if path == '/api/images' or path == '/api/images/':
+            if response_format == 'image':
+                # 如果要求返回图片，随机选一张并重定向
+                if await self.use_legacy():
+                    image = await self.r.srandmember(LEGACY_WALLPAPERS)
+                else:
+                    image = await self.r.zrandmember(WALLPAPER_INDEX)
+                if image:
+                    return redirect_response(image)  # 直接使用存储的完整URL
+                return json_response({"status": "error", "message": "没有找到图片"}, 404)
+
+            paged = 'offset' in params or 'limit' in params
+            try:
+                offset, limit = parse_page_params(params)
+                cursor = int(params['cursor']) if 'cursor' in params else None
+            except ValueError:
+                return json_response({"status": "error", "message": "无效的分页参数"}, 400)
+
+            if response_format == 'ndjson':
+                # 流式输出，可与 offset/limit 组合
+                return self.ndjson_response(self.iter_images(sort_by, offset, limit if paged else None))
+            elif cursor is not None:
+                # 游标分页（ZSCAN，不保证顺序）
+                images_list, next_cursor = await self.get_cursor_page(cursor, limit)
+                return self.json_response({
+                    "status": "success",
+                    "count": len(images_list),
+                    "cursor": next_cursor,
+                    "images": images_list
+                })
+            elif paged:
+                # offset/limit 分页
+                images_list, total = await self.get_page(sort_by, offset, limit)
+                next_offset = offset + limit
+                return self.json_response({
+                    "status": "success",
+                    "count": len(images_list),
+                    "total": total,
+                    "offset": offset,
+                    "limit": limit,
+                    "next_offset": next_offset if next_offset < total else None,
+                    "sort": sort_by,
+                    "images": images_list
+                })
+            else:
+                # 默认返回完整列表
+                images_list = await self.get_sorted_images(sort_by)
+                return self.json_response({
+                    "status": "success",
+                    "count": len(images_list),
+                    "sort": sort_by,
+                    "images": images_list
+                })
+
+        elif path == '/api/images/search':
+            query = params.get('q', '').strip()
+            if not query:
+                return json_response({"status": "error", "message": "缺少搜索词 q"}, 400)
+            if not wallpaper_index.tokenize(query, query=True):
+                # 非中日文的单个字母不建索引
+                return json_response({"status": "error", "message": "搜索词太短，单个字母不参与搜索"}, 400)
+            try:
+                offset, limit = parse_page_params(params)
+            except ValueError:
+                return json_response({"status": "error", "message": "无效的分页参数"}, 400)
+            results, total = await self.search(query, params.get('mkt'), offset, limit)
+            if response_format == 'image':
+                if not results:
+                    return json_response({"status": "error", "message": "没有找到图片"}, 404)
+                return redirect_response(results[0]["url"])
+            next_offset = offset + limit
+            return self.json_response({
+                "status": "success",
+                "query": query,
+                "count": len(results),
+                "total": total,
+                "offset": offset,
+                "limit": limit,
+                "next_offset": next_offset if next_offset < total else None,
+                "images": results
+            })
+
+        elif path == '/api/images/date' or path.startswith('/api/images/date/'):
+            market = params.get('mkt') or None
+            try:
+                offset, limit = parse_page_params(params)
+                if path.startswith('/api/images/date/'):
+                    # 单日：/api/images/date/20251103
+                    start = end = _dates.parse_date(path[len('/api/images/date/'):])
+                else:
+                    # 范围：/api/images/date?from=20251101&to=20251130，两端都包含，可以只给一端
+                    start = _dates.parse_date(params['from']) if params.get('from') else None
+                    end = _dates.parse_date(params['to']) if params.get('to') else None
+            except ValueError:
+                return json_response({"status": "error", "message": "无效的日期或分页参数，日期格式为 YYYYMMDD"}, 400)
+            if start and end and start > end:
+                return json_response({"status": "error", "message": "from 不能晚于 to"}, 400)
+
+            results, total = await self.get_date_range(market, start, end, offset, limit, sort_by)
+            if response_format == 'image':
+                if not results:
+                    return json_response({"status": "error", "message": "没有找到图片"}, 404)
+                return redirect_response(results[0]["url"])
+            if path.startswith('/api/images/date/') and not results:
+                return json_response({"status": "error", "message": "没有找到该日期的图片"}, 404)
+            next_offset = offset + limit
+            return self.json_response({
+                "status": "success",
+                "from": start,
+                "to": end,
+                "market": market,
+                "count": len(results),
+                "total": total,
+                "offset": offset,
+                "limit": limit,
+                "next_offset": next_offset if next_offset < total else None,
+                "images": results
+            })
+
+        elif path == '/api/images/latest':
+            # 获取最新一张图片（按日期排列的最后一个）
+            latest_image, total, _ = await self.get_image_at(-1, 'date')
+
+            if not latest_image:
+                return json_response({"status": "error", "message": "没有找到图片"}, 404)
+
+            if response_format == 'image':
+                # 直接重定向到最新图片
+                return redirect_response(latest_image)  # 直接使用存储的完整URL
+            # 返回JSON格式
+            return self.json_response({
+                "status": "success",
+                "image": latest_image,
+                "total": total
+            })
+
+        elif path == '/api/images/today':
+            # 获取今日壁纸
+            today_wallpaper = await self.get_today_wallpaper()
+
+            if not today_wallpaper:
+                return json_response({"status": "error", "message": "没有找到图片"}, 404)
+
+            if response_format == 'image':
+                # 直接重定向到今日壁纸
+                return redirect_response(today_wallpaper)
+            # 返回JSON格式
+            return self.json_response({
+                "status": "success",
+                "type": "today_wallpaper",
+                "date": datetime.now().strftime('%Y-%m-%d'),
+                "image": today_wallpaper,
+                "cache_info": "每日更新，缓存24小时"
+            })
+
+        elif path.startswith('/api/images/position/'):
+            # 获取指定位置的图片
+            try:
+                position = int(path.split('/')[-1])
+            except ValueError:
+                return json_response({"status": "error", "message": "无效的位置参数"}, 400)
+
+            selected_image, total, position = await self.get_image_at(position, sort_by)
+
+            if not total:
+                return json_response({"status": "error", "message": "没有找到图片"}, 404)
+
+            if selected_image is None:
+                return json_response({
+                    "status": "error",
+                    "message": f"位置超出范围，有效范围: 0-{total-1} (或 -1 到 -{total})",
+                    "available_positions": total
+                }, 400)
+
+            if response_format == 'image':
+                # 直接重定向到指定位置的图片
+                return redirect_response(selected_image)  # 直接使用存储的完整URL
+            # 返回JSON格式
+            return self.json_response({
+                "status": "success",
+                "position": position,
+                "total": total,
+                "sort": sort_by,
+                "image": selected_image
+            })
+
+
+def parse_page_params(params):
+    """解析 offset / limit 参数，非法时抛出 ValueError"""
+    offset = int(params.get('offset', 0))
+    limit = int(params.get('limit', DEFAULT_PAGE_LIMIT))
+    if offset < 0 or limit <= 0:
+        raise ValueError("offset/limit 超出范围")
+    return offset, min(limit, MAX_PAGE_LIMIT)
+
+
+def with_server_timing(response, timing, raw_path):
+    """开启 API_TIMING 时附加 Server-Timing 响应头（流式响应只统计到开始输出为止）"""
+    value = _timing.finish(timing, raw_path, response.status)
+    if value is not None:
+        response.headers.append(('Server-Timing', value))
+    return response
+
+
+async def handle_images(raw_path, headers):
+    """/api/images* 路由入口，headers 的键为小写"""
+    timing = _timing.start('images')
+    response = await ImagesRequest(get_async_redis_client(), headers).handle(raw_path)
+    return with_server_timing(response, timing, raw_path)
+
+
+async def refill_random_pool():
+    """从 Redis 一次取一批随机图片放入本地池"""
+    try:
+        r = get_async_redis_client()
+        members = await r.zrandmember(WALLPAPER_INDEX, RANDOM_POOL_SIZE)
+        if not members:
+            members = await r.srandmember(LEGACY_WALLPAPERS, RANDOM_POOL_SIZE)
+        _random_pool.extend(members)
+    except Exception:
+        pass  # 补充失败时请求会直接走 Redis
+
+
+def maybe_refill_random_pool():
+    global _refill_task
+    if len(_random_pool) < RANDOM_POOL_SIZE // 2 and (_refill_task is None or _refill_task.done()):
+        _refill_task = asyncio.ensure_future(refill_random_pool())
+
+
+async def get_bing():
+    """获取随机 Bing 图片 URL"""
+    if RANDOM_POOL_SIZE > 0:
+        maybe_refill_random_pool()
+        try:
+            return _random_pool.popleft(), None
+        except IndexError:
+            pass  # 池为空，直接查询 Redis
+
+    try:
+        r = get_async_redis_client()
+        # 一次往返（EVALSHA）
+        image_url = await get_script(r, RANDOM_IMAGE_SCRIPT)(keys=[WALLPAPER_INDEX, LEGACY_WALLPAPERS], client=r)
+        if not image_url:
+            return None, "图片集合不存在或为空"
+        return image_url, None
+
+    except Exception as e:
+        return None, f"Redis 错误: {str(e)}"
+
+
+def render_home_page():
+    """渲染首页"""
+    return f"""
+<!DOCTYPE html>
+    <html lang="zh-CN">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Wallpaper Image API</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
+            .container {{ background: #f5f5f5; padding: 20px; border-radius: 8px; }}
+            code {{ background: #eee; padding: 2px 6px; border-radius: 3px; }}
+            .endpoint {{ margin: 15px 0; padding: 10px; background: white; border-left: 4px solid #007cba; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>🖼️ Wallpaper Image API</h1>
+            <p>这是一个简单的壁纸图片 API 服务</p>
+            <h2>📚 API 端点</h2>
+            <div class="endpoint">
+                <h3>获取所有图片列表</h3>
+                <p><code>GET /api/images</code></p>
+                <p><strong>参数:</strong> <code>sort</code> (date, reverse, random), <code>format</code> (json, image, ndjson), <code>offset</code>, <code>limit</code>, <code>cursor</code></p>
+                <p><strong>示例:</strong> <a href="/api/images" target="_blank">/api/images</a></p>
+            </div>
+            <div class="endpoint">
+                <h3>获取最新图片</h3>
+                <p><code>GET /api/images/latest</code></p>
+                <p><strong>参数:</strong> <code>format</code> (json, image)</p>
+                <p><strong>示例:</strong>
+                    <a href="/api/images/latest" target="_blank">JSON格式</a> |
+                    <a href="/api/images/latest?format=image" target="_blank">直接跳转图片</a>
+                </p>
+            </div>
+
+            <div class="endpoint">
+                <h3>获取指定位置图片</h3>
+                <p><code>GET /api/images/position/{{number}}</code></p>
+                <p><strong>参数:</strong> <code>format</code> (json, image)</p>
+                <p><strong>示例:</strong>
+                    <a href="/api/images/position/0" target="_blank">第1张(JSON)</a> |
+                    <a href="/api/images/position/0?format=image" target="_blank">第1张(图片)</a>
+                </p>
+            </div>
+
+            <div class="endpoint">
+                <h3>获取今日壁纸（缓存24小时）</h3>
+                <p><code>GET /api/images/today</code></p>
+                <p><strong>参数:</strong> <code>format</code> (json, image)</p>
+                <p><strong>示例:</strong>
+                    <a href="/api/images/today" target="_blank">JSON格式</a> |
+                    <a href="/api/images/today?format=image" target="_blank">直接跳转图片</a>
+                </p>
+            </div>
+
+            <h2>🔄 使用方式</h2>
+            <pre><code># 获取随机图片
+curl -L "{DOMAIN}/api/images?format=image"
+
+# 获取最新图片信息
+curl "{DOMAIN}/api/images/latest"
+
+# 获取所有图片列表
+curl "{DOMAIN}/api/images?sort=random"
+
+# 获取今日壁纸
+curl -L "{DOMAIN}/api/today?format=image"
+</code></pre>
+        </div>
+    </body>
+</html>
+    """
+
+
+# 首页是静态内容，渲染一次并以内容哈希作为 ETag
+HOME_PAGE = render_home_page().encode('utf-8')
+HOME_PAGE_ETAG = '"{}"'.format(hashlib.sha1(HOME_PAGE).hexdigest()[:20])
+
+
+async def handle_index(raw_path, headers):
+    """首页和随机跳转的路由入口，headers 的键为小写"""
+    timing = _timing.start('index')
+    return with_server_timing(await route_index(raw_path, headers), timing, raw_path)
+
+
+async def route_index(raw_path, headers):
+    if raw_path == '/' or raw_path == '/index.html':
+        validators = [('ETag', HOME_PAGE_ETAG), ('Cache-Control', HOME_PAGE_CACHE_CONTROL)]
+        if etag_matches(headers, HOME_PAGE_ETAG):
+            return Response(304, validators)
+        return Response(200, [('Content-type', 'text/html; charset=utf-8')] + validators, HOME_PAGE)
+
+    # 获取随机图片
+    image_url, error = await get_bing()
+    if error:
+        # 返回错误信息
+        return json_response({
+            "status": "error",
+            "message": error,
+            "timestamp": get_now_time()
+        }, 500)
+    # 执行重定向
+    return redirect_response(image_url)
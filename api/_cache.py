@@ -0,0 +1,83 @@
+# api/_cache.py
+# 进程内的图片列表缓存：数据每天最多更新一次，热启动的实例不必每次都从 Redis 全量读取
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from wallpaper_index import DATA_VERSION_KEY
+
+CACHE_TTL = float(os.environ.get('CACHE_TTL', '300'))
+CACHE_MAX_SIZE = int(os.environ.get('CACHE_MAX_SIZE', '64'))
+# 两次检查数据版本之间的最小间隔（秒），间隔内不访问 Redis
+VERSION_CHECK_INTERVAL = float(os.environ.get('CACHE_VERSION_CHECK_INTERVAL', '30'))
+
+
+class TTLCache:
+    """带过期时间和最大条目数（LRU 淘汰）的线程安全缓存"""
+
+    MISSING = object()
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        """返回缓存的值，不存在或已过期时返回 TTLCache.MISSING"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return self.MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return self.MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+response_cache = TTLCache()
+
+_data_version = None
+_version_checked_at = None
+
+
+async def get_data_version(r):
+    """
+    获取数据版本，VERSION_CHECK_INTERVAL 内直接返回上次的结果；
+    版本变化时清空缓存
+
+    :param r: 异步 Redis 客户端
+    """
+    global _data_version, _version_checked_at
+    now = time.monotonic()
+    if _version_checked_at is None or now - _version_checked_at >= VERSION_CHECK_INTERVAL:
+        version = await r.get(DATA_VERSION_KEY)
+        if version != _data_version:
+            response_cache.clear()
+            _data_version = version
+        _version_checked_at = now
+    return _data_version
+
+
+async def cached(r, key, loader):
+    """以 (数据版本,) + key 为键缓存 await loader() 的结果"""
+    full_key = (await get_data_version(r),) + tuple(key)
+    value = response_cache.get(full_key)
+    if value is TTLCache.MISSING:
+        value = await loader()
+        response_cache.set(full_key, value)
+    return value
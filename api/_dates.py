@@ -0,0 +1,13 @@
+# api/_dates.py
+# 按日期查询的参数解析。索引 wallpapers:dates（所有地区）和 wallpapers:dates:{地区} 的键名见根目录的 wallpaper_index.py，
+# 由 post_to_redis 写入，/api/images/date 读取
+from datetime import datetime
+
+
+def parse_date(value):
+    """接受 YYYYMMDD 或 YYYY-MM-DD，返回 YYYYMMDD，非法时抛出 ValueError"""
+    value = value.replace('-', '')
+    datetime.strptime(value, '%Y%m%d')
+    if len(value) != 8:
+        raise ValueError(value)
+    return value
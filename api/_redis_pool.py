@@ -0,0 +1,73 @@
+# api/_redis_pool.py
+# 以下划线开头，Vercel 不会把它当作独立的函数部署
+import asyncio
+import os
+import threading
+
+import redis
+import redis.asyncio
+
+import _timing
+
+# 连接空闲超过该秒数后，下次取用前才会 PING 检查，代替每个请求都 PING
+HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', '30'))
+
+_pool = None
+_pool_lock = threading.Lock()
+# 异步连接绑定在创建它的事件循环上，每个事件循环一个连接池
+_async_pools = {}
+
+
+def get_connection_kwargs():
+    return dict(
+        host=os.environ.get('REDIS_HOST'),
+        port=int(os.environ.get('REDIS_PORT') or 6379),
+        password=os.environ.get('REDIS_PASSWORD'),
+        decode_responses=True,  # 自动解码，不需要手动 decode
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        health_check_interval=HEALTH_CHECK_INTERVAL
+    )
+
+
+def use_ssl():
+    return os.environ.get('REDIS_SSL', 'true').lower() != 'false'
+
+
+def get_connection_pool():
+    """模块级连接池，首次使用时创建，在同一实例的热启动调用之间复用"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = redis.ConnectionPool(
+                    connection_class=_timing.connection_class(redis.SSLConnection if use_ssl() else redis.Connection),
+                    **get_connection_kwargs()
+                )
+    return _pool
+
+
+def get_redis_client():
+    """获取使用共享连接池的 Redis 客户端，创建客户端本身不会建立连接"""
+    return redis.Redis(connection_pool=get_connection_pool())
+
+
+def get_async_redis_client():
+    """获取当前事件循环共享连接池的异步 Redis 客户端"""
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = redis.asyncio.ConnectionPool(
+            connection_class=_timing.connection_class(
+                redis.asyncio.SSLConnection if use_ssl() else redis.asyncio.Connection, is_async=True),
+            **get_connection_kwargs()
+        )
+        _async_pools[loop] = pool
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+async def close_async_pool():
+    """关闭当前事件循环的连接池（ASGI 应用退出时调用）"""
+    pool = _async_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.disconnect()
@@ -0,0 +1,61 @@
+# api/_runner.py
+# 让 BaseHTTPRequestHandler 调用 _app 中的异步路由：
+# 在后台线程里常驻一个事件循环，异步连接池随之在热启动的调用之间复用
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='api-event-loop', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run(coro):
+    """在后台事件循环中执行协程并等待结果"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+def _next_chunk(stream):
+    async def step():
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+    return run(step())
+
+
+def send_response(handler, response):
+    """把 _app.Response 写到 BaseHTTPRequestHandler"""
+    handler.send_response(response.status)
+    for name, value in response.headers:
+        handler.send_header(name, value)
+    handler.end_headers()
+    if response.stream is None:
+        if response.body:
+            handler.wfile.write(response.body)
+        return
+    while True:
+        chunk = _next_chunk(response.stream)
+        if chunk is None:
+            break
+        handler.wfile.write(chunk)
+        handler.wfile.flush()
+
+
+def handle(handler, route):
+    """
+    以 route(raw_path, headers) 处理当前请求
+
+    :param route: _app.handle_images 或 _app.handle_index
+    """
+    headers = {name.lower(): value for name, value in handler.headers.items()}
+    send_response(handler, run(route(handler.path, headers)))
@@ -0,0 +1,44 @@
+# api/_search.py
+# /api/images/search 的查询：求倒排列表的交集并取一页，索引的键名和分词规则见根目录的 wallpaper_index.py
+#
+# 多个词或指定地区时由 ZINTERSTORE 在服务端求交集（地区即与 wallpapers:dates:{地区} 求交集），
+# 临时结果只在 MULTI 事务内存在，只有当前页的 id 返回给客户端，不读取整个倒排列表。
+import json
+import uuid
+
+from wallpaper_index import IMAGE_META, SEARCH_TOKEN_PREFIX, date_index_key
+
+# 单次查询最多使用的词数，超出部分忽略
+MAX_QUERY_TOKENS = 16
+# 交集的临时结果，每次查询一个随机键，同一事务内删除
+SEARCH_RESULT_PREFIX = "search:q:"
+
+
+async def search(r, tokens, market=None, offset=0, limit=50):
+    """
+    求所有词的倒排列表（指定 market 时再加上该地区的日期索引）的交集，返回一页结果
+
+    :param r: 异步 Redis 客户端
+    :return: (当前页的图片元数据（新 -> 旧）, 命中总数)
+    """
+    keys = [SEARCH_TOKEN_PREFIX + token for token in tokens[:MAX_QUERY_TOKENS]]
+    if market:
+        keys.append(date_index_key(market))
+    stop = offset + limit - 1
+    if len(keys) == 1:
+        # 单个词：ZCARD + ZREVRANGE 只取当前页
+        pipe = r.pipeline(transaction=False)
+        pipe.zcard(keys[0])
+        pipe.zrevrange(keys[0], offset, stop)
+        total, ids = await pipe.execute()
+    else:
+        # score 都是 startdate，取 MAX 即原值；ZINTERSTORE 返回交集大小即命中总数
+        result_key = SEARCH_RESULT_PREFIX + uuid.uuid4().hex
+        pipe = r.pipeline(transaction=True)
+        pipe.zinterstore(result_key, keys, aggregate='MAX')
+        pipe.zrevrange(result_key, offset, stop)
+        pipe.delete(result_key)
+        total, ids, _ = await pipe.execute()
+    if not ids:
+        return [], total
+    return [json.loads(meta) for meta in await r.hmget(IMAGE_META, ids) if meta], total
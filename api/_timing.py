@@ -0,0 +1,219 @@
+# api/_timing.py
+# 请求级的耗时统计：各阶段耗时、Redis 命令数、往返次数和收发字节数，
+# 以 Server-Timing 响应头返回，API_TIMING_LOG=true 时另外输出一行 JSON 日志。
+#
+# API_TIMING=true 开启。关闭时 start() 返回 None、stage() 返回共享的空上下文，
+# 连接池也使用原来的连接类，请求路径上只多一次布尔判断。
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import time
+
+ENABLED = os.environ.get('API_TIMING', 'false').lower() == 'true'
+LOG_ENABLED = ENABLED and os.environ.get('API_TIMING_LOG', 'false').lower() == 'true'
+
+_current = contextvars.ContextVar('request_timing', default=None)
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class RequestTiming:
+    """一次请求的统计，保存在 contextvar 中，同一请求内的 Redis 连接和各阶段都记到这里"""
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.redis_commands = 0
+        self.redis_round_trips = 0
+        self.redis_bytes_sent = 0
+        self.redis_bytes_received = 0
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header_value(self, total_ms):
+        """如 total;dur=3.1, redis;dur=1.9;desc="cmds=2 trips=1 out=87B in=412B", json;dur=0.2"""
+        metrics = ['total;dur={:.2f}'.format(total_ms)]
+        for name, ms in self.stages.items():
+            if name == 'redis':
+                metrics.append('redis;dur={:.2f};desc="cmds={} trips={} out={}B in={}B"'.format(
+                    ms, self.redis_commands, self.redis_round_trips, self.redis_bytes_sent, self.redis_bytes_received))
+            else:
+                metrics.append('{};dur={:.2f}'.format(name, ms))
+        return ', '.join(metrics)
+
+    def log(self, path, status, total_ms):
+        print(json.dumps({
+            "timing": self.route,
+            "path": path,
+            "status": status,
+            "total_ms": round(total_ms, 3),
+            "stages_ms": {name: round(ms, 3) for name, ms in self.stages.items()},
+            "redis": {
+                "commands": self.redis_commands,
+                "round_trips": self.redis_round_trips,
+                "bytes_sent": self.redis_bytes_sent,
+                "bytes_received": self.redis_bytes_received,
+            },
+        }, ensure_ascii=False), file=sys.stdout, flush=True)
+
+
+def start(route):
+    """开始统计当前请求（在处理请求的协程或线程中调用），关闭时返回 None"""
+    if not ENABLED:
+        return None
+    timing = RequestTiming(route)
+    _current.set(timing)
+    return timing
+
+
+@contextlib.contextmanager
+def _stage(timing, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+def stage(name):
+    """统计一个阶段的耗时：with _timing.stage('json'): ..."""
+    if not ENABLED:
+        return _NULL_STAGE
+    timing = _current.get()
+    if timing is None:
+        return _NULL_STAGE
+    return _stage(timing, name)
+
+
+def finish(timing, path, status):
+    """
+    结束统计
+
+    :return: Server-Timing 头的值，timing 为 None 时返回 None
+    """
+    if timing is None:
+        return None
+    total_ms = timing.total_ms()
+    if LOG_ENABLED:
+        timing.log(path, status, total_ms)
+    return timing.header_value(total_ms)
+
+
+def _response_size(value):
+    """估算 Redis 响应的字节数（只在开启统计时计算）"""
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_response_size(item) for item in value)
+    if value is None:
+        return 0
+    return len(str(value))
+
+
+def _packed_size(packed):
+    if isinstance(packed, (bytes, bytearray, memoryview, str)):
+        return len(packed)
+    return sum(len(part) for part in packed)
+
+
+class TimedConnectionMixin:
+    """同步连接：把命令数、往返次数、字节数和耗时记到当前请求"""
+
+    def connect(self):
+        if self._sock:
+            return super().connect()
+        # 新建连接（含 TLS 握手）单独统计
+        with stage('redis_connect'):
+            return super().connect()
+
+    def send_command(self, *args, **kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.redis_commands += 1
+        return super().send_command(*args, **kwargs)
+
+    def pack_commands(self, commands):
+        commands = list(commands)
+        timing = _current.get()
+        if timing is not None:
+            timing.redis_commands += len(commands)
+        return super().pack_commands(commands)
+
+    def send_packed_command(self, command, *args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return super().send_packed_command(command, *args, **kwargs)
+        timing.redis_round_trips += 1
+        timing.redis_bytes_sent += _packed_size(command)
+        with _stage(timing, 'redis'):
+            return super().send_packed_command(command, *args, **kwargs)
+
+    def read_response(self, *args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return super().read_response(*args, **kwargs)
+        with _stage(timing, 'redis'):
+            response = super().read_response(*args, **kwargs)
+        timing.redis_bytes_received += _response_size(response)
+        return response
+
+
+class AsyncTimedConnectionMixin:
+    """redis.asyncio 连接，统计内容与 TimedConnectionMixin 相同"""
+
+    async def connect(self):
+        if self.is_connected:
+            return await super().connect()
+        with stage('redis_connect'):
+            return await super().connect()
+
+    async def send_command(self, *args, **kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.redis_commands += 1
+        return await super().send_command(*args, **kwargs)
+
+    def pack_commands(self, commands):
+        commands = list(commands)
+        timing = _current.get()
+        if timing is not None:
+            timing.redis_commands += len(commands)
+        return super().pack_commands(commands)
+
+    async def send_packed_command(self, command, *args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return await super().send_packed_command(command, *args, **kwargs)
+        timing.redis_round_trips += 1
+        timing.redis_bytes_sent += _packed_size(command)
+        with _stage(timing, 'redis'):
+            return await super().send_packed_command(command, *args, **kwargs)
+
+    async def read_response(self, *args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return await super().read_response(*args, **kwargs)
+        with _stage(timing, 'redis'):
+            response = await super().read_response(*args, **kwargs)
+        timing.redis_bytes_received += _response_size(response)
+        return response
+
+
+_connection_classes = {}
+
+
+def connection_class(base, is_async=False):
+    """开启统计时返回 base 的带统计子类，否则原样返回 base"""
+    if not ENABLED:
+        return base
+    cls = _connection_classes.get(base)
+    if cls is None:
+        mixin = AsyncTimedConnectionMixin if is_async else TimedConnectionMixin
+        cls = _connection_classes[base] = type('Timed' + base.__name__, (mixin, base), {})
+    return cls
@@ -1,20 +1,19 @@
 # api/debug.py
 from http.server import BaseHTTPRequestHandler
-import redis
 import os
+import sys
 import json
 
-def get_redis_client():
-    return redis.Redis(
-        host=os.environ.get('REDIS_HOST'),
-        port=os.environ.get('REDIS_PORT'),
-        password=os.environ.get('REDIS_PASSWORD'),
-        ssl=True,
-        decode_responses=True
-    )
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# 根目录的 wallpaper_index.py 与 post_to_redis 共用，放在最后，不会遮住 api/ 中的模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _redis_pool import get_redis_client, HEALTH_CHECK_INTERVAL
+from wallpaper_index import IMAGE_META, SEARCH_TOKEN_PREFIX
+import _timing
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
+        timing = _timing.start('debug')
         try:
             r = get_redis_client()
             
@@ -26,13 +25,22 @@ class handler(BaseHTTPRequestHandler):
             count = r.scard("bing_images") if exists else 0
             sample_images = r.srandmember("bing_images", 5) if count > 0 else []
             
-            # 获取所有键
-            all_keys = r.keys('*')
+            # 遍历一次所有键（SCAN，不用会阻塞 Redis 的 KEYS）；搜索索引每个词一个键，只统计数量
+            all_keys = []
+            search_token_count = 0
+            for key in r.scan_iter(count=1000):
+                if key.startswith(SEARCH_TOKEN_PREFIX):
+                    search_token_count += 1
+                else:
+                    all_keys.append(key)
             
             info = {
                 "redis_connection": "success" if ping_result else "failed",
+                "health_check_interval": HEALTH_CHECK_INTERVAL,
                 "bing_images_exists": exists,
                 "bing_images_count": count,
+                "search_indexed_images": r.hlen(IMAGE_META),
+                "search_token_count": search_token_count,
                 "sample_images": sample_images,
                 "all_keys": all_keys,
                 "environment_vars": {
@@ -42,10 +50,16 @@ class handler(BaseHTTPRequestHandler):
                 }
             }
             
+            with _timing.stage('json'):
+                body = json.dumps(info, indent=2).encode('utf-8')
+            server_timing = _timing.finish(timing, self.path, 200)
+
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
+            if server_timing:
+                self.send_header('Server-Timing', server_timing)
             self.end_headers()
-            self.wfile.write(json.dumps(info, indent=2).encode('utf-8'))
+            self.wfile.write(body)
             
         except Exception as e:
             self.send_response(500)
@@ -0,0 +1,61 @@
+# coding:utf-8
+"""
+图片 API 的 ASGI 入口（Vercel 之外部署时使用），路由与 api/images.py、api/index.py 相同
+
+    pip install uvicorn
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+from _app import handle_images, handle_index
+from _redis_pool import close_async_pool
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    raw_path = scope['path']
+    if scope.get('query_string'):
+        raw_path += '?' + scope['query_string'].decode('latin-1')
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+    if scope['method'] not in ('GET', 'HEAD'):
+        await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET, HEAD')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if scope['path'].startswith('/api/images'):
+        response = await handle_images(raw_path, headers)
+    else:
+        response = await handle_index(raw_path, headers)
+
+    # HEAD 只发送响应头，Content-Length 与 GET 相同
+    head = scope['method'] == 'HEAD'
+    response_headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers]
+    if response.stream is None:
+        response_headers.append((b'content-length', str(len(response.body)).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': response.status, 'headers': response_headers})
+    if response.stream is None:
+        await send({'type': 'http.response.body', 'body': b'' if head else response.body})
+        return
+    if not head:
+        async for chunk in response.stream:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,10 @@
+# coding:utf-8
+"""
+抓取、发布和 API 热点路径的基准测试
+
+用 data/{region}_all.json 生成 1k / 10k / 100k 条的合成历史，回放录制的 HPImageArchive 响应跑一遍 main.main，
+通过 post_to_redis 写入本地 Redis，再逐个驱动 api/*.py 的路由，输出耗时、内存分配和 Redis 往返次数。
+
+用法:
+    python -m bench [--sizes 1000 10000 100000] [--repeat 5] [--json] [--output result.json] [--baseline old.json]
+"""
@@ -0,0 +1,117 @@
+# coding:utf-8
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import redis
+
+from bench.fixtures import ROOT, build_fixture
+from bench.stages import bench_api, bench_backfill, bench_ingest, bench_publish
+
+sys.path.insert(0, ROOT)
+from loadtest import start_redis_server
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def get_now_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+
+def run(sizes, region, repeat, r, stages):
+    results = {}
+    for size in sizes:
+        print("[{}] 生成 {} 条合成历史".format(get_now_time(), size))
+        fixture = build_fixture(region, size)
+        size_results = {}
+        with tempfile.TemporaryDirectory(prefix='bench-') as work_dir:
+            if 'ingest' in stages:
+                print("[{}] ingest: main.main / export_all_json / load_images".format(get_now_time()))
+                size_results.update(bench_ingest(fixture, work_dir, repeat))
+            if 'backfill' in stages:
+                print("[{}] backfill: ALL.backfill".format(get_now_time()))
+                size_results.update(bench_backfill(fixture, work_dir, r, repeat))
+            if 'publish' in stages:
+                print("[{}] publish: post_to_redis".format(get_now_time()))
+                if 'ingest' not in stages:
+                    # publish.daily 读取 ingest 阶段写下的 {region}_temp.json
+                    bench_ingest(fixture, work_dir, 0)
+                size_results.update(bench_publish(fixture, r, repeat))
+            if 'api' in stages:
+                print("[{}] api: api/*.py 路由".format(get_now_time()))
+                size_results.update(bench_api(fixture, r, repeat))
+        results[str(size)] = size_results
+    return results
+
+
+def format_delta(value, old):
+    if old in (None, 0) or value is None:
+        return ""
+    return "{:+.0f}%".format((value - old) / old * 100)
+
+
+def print_table(results, baseline=None):
+    columns = "{:<28} {:>10} {:>10} {:>8} {:>11} {:>8} {:>8}"
+    for size, size_results in results.items():
+        print()
+        print("size = {}".format(size))
+        print(columns.format("stage", "median ms", "min ms", "Δ", "peak KiB", "trips", "cmds"))
+        for stage, result in size_results.items():
+            old = ((baseline or {}).get(size) or {}).get(stage) or {}
+            print(columns.format(
+                stage, result["median_ms"], result["min_ms"], format_delta(result["median_ms"], old.get("median_ms")),
+                result["peak_kib"], result["round_trips"], result["commands"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="抓取、发布和 API 热点路径的基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="合成历史的条数")
+    parser.add_argument('--region', default='zh-CN', help="用作种子数据的地区")
+    parser.add_argument('--repeat', type=int, default=5, help="每项计时的重复次数")
+    parser.add_argument('--stage', action='append', dest='stages', choices=['ingest', 'backfill', 'publish', 'api'],
+                        help="只运行指定阶段，可重复指定")
+    parser.add_argument('--redis-server', default='redis-server', help="redis-server 可执行文件")
+    parser.add_argument('--use-env-redis', action='store_true',
+                        help="使用 REDIS_HOST / REDIS_PORT 指向的实例（会清空当前数据库），不启动替身")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出结果")
+    parser.add_argument('--output', help="把 JSON 结果写入文件")
+    parser.add_argument('--baseline', help="与之前 --output 保存的结果对比")
+    args = parser.parse_args()
+
+    redis_process = None
+    if args.use_env_redis:
+        r = redis.Redis(host=os.environ.get('REDIS_HOST'), port=int(os.environ.get('REDIS_PORT') or 6379),
+                        password=os.environ.get('REDIS_PASSWORD'),
+                        ssl=os.environ.get('REDIS_SSL', 'true').lower() != 'false', decode_responses=True)
+    else:
+        redis_process, redis_port = start_redis_server(args.redis_server)
+        os.environ.update(REDIS_HOST='127.0.0.1', REDIS_PORT=str(redis_port), REDIS_SSL='false')
+        os.environ.pop('REDIS_PASSWORD', None)
+        r = redis.Redis(port=redis_port, decode_responses=True)
+
+    try:
+        results = run(args.sizes, args.region, args.repeat, r, args.stages or ['ingest', 'backfill', 'publish', 'api'])
+    finally:
+        r.close()
+        if redis_process is not None:
+            redis_process.terminate()
+            redis_process.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# coding:utf-8
+"""
+HPImageArchive 的本地替身：按 mkt / idx / n 从录制的历史中切出响应
+
+每个地区的响应以 {region}_update.json 为外壳（tooltips 等字段），images 换成
+{region}_all.json 中第 idx 张起的 n 张，与真实接口的分页方式一致，但不限制 idx 的范围。
+
+用法:
+    python -m bench.archive_server [--port 8000] [--data-dir data] [--max-idx N]
+    python ALL.py backfill zh-CN --base-url http://127.0.0.1:8000/HPImageArchive.aspx --max-idx 40
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench.fixtures import SOURCE_DIR
+
+ARCHIVE_PATH = "/HPImageArchive.aspx"
+
+
+def load_recorded(data_dir=SOURCE_DIR, markets=None):
+    """
+    读取录制的响应外壳和历史
+
+    :return: {地区: (外壳, 图片列表（新 -> 旧）)}
+    """
+    recorded = {}
+    for name in sorted(os.listdir(data_dir)):
+        if not name.endswith('_all.json') or name == 'template_all.json':
+            continue
+        region = name[:-len('_all.json')]
+        if markets is not None and region not in markets:
+            continue
+        with open(os.path.join(data_dir, name), 'r', encoding='utf-8') as f:
+            images = json.load(f)["data"]
+        envelope = {}
+        update_path = os.path.join(data_dir, f'{region}_update.json')
+        if os.path.exists(update_path):
+            with open(update_path, 'r', encoding='utf-8') as f:
+                envelope = {k: v for k, v in json.load(f).items() if k != "images"}
+        recorded[region] = (envelope, images)
+    return recorded
+
+
+class ArchiveServer(ThreadingHTTPServer):
+    """
+    :param recorded: {地区: (外壳, 图片列表)}
+    :param max_idx: 超过时返回空的 images（模拟真实接口只保留最近几天），None 表示不限制
+    """
+    daemon_threads = True
+
+    def __init__(self, recorded, port=0, max_idx=None):
+        super().__init__(('127.0.0.1', port), ArchiveHandler)
+        self.recorded = recorded
+        self.max_idx = max_idx
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:{}{}".format(self.server_address[1], ARCHIVE_PATH)
+
+    def response_for(self, market, idx, n):
+        envelope, images = self.recorded.get(market, ({}, []))
+        if self.max_idx is not None and idx > self.max_idx:
+            return dict(envelope, images=[])
+        return dict(envelope, images=images[idx:idx + n])
+
+    def start(self):
+        """在后台线程中运行，返回停止函数"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            self.shutdown()
+            self.server_close()
+            thread.join()
+        return stop
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != ARCHIVE_PATH:
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        try:
+            idx = int(query.get('idx', ['0'])[0])
+            n = int(query.get('n', ['1'])[0])
+        except ValueError:
+            self.send_error(400)
+            return
+        with self.server.lock:
+            self.server.requests += 1
+        body = json.dumps(self.server.response_for(query.get('mkt', [''])[0], idx, n),
+                          ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.archive_server", description="HPImageArchive 本地替身")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data-dir', default=SOURCE_DIR, help="录制的 {region}_all.json 所在目录")
+    parser.add_argument('--max-idx', type=int, help="超过此 idx 时返回空列表")
+    args = parser.parse_args()
+    server = ArchiveServer(load_recorded(args.data_dir), args.port, args.max_idx)
+    print("HPImageArchive 替身: {}（{} 个地区）".format(server.base_url, len(server.recorded)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# coding:utf-8
+"""
+基准测试数据：合成历史、录制的 HPImageArchive 响应和回放用的 requests 适配器
+"""
+import copy
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import BaseAdapter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import image_urls
+
+SOURCE_DIR = os.path.join(ROOT, 'data')
+# 录制的响应中的图片数量（与 HPImageArchive 的 n=8 一致）
+RESPONSE_SIZE = 8
+
+
+def load_source(region):
+    """读取真实的历史记录和最近一次录制的 API 响应"""
+    with open(os.path.join(SOURCE_DIR, f'{region}_all.json'), 'r', encoding='utf-8') as f:
+        history = json.load(f)
+    with open(os.path.join(SOURCE_DIR, f'{region}_update.json'), 'r', encoding='utf-8') as f:
+        recorded = json.load(f)
+    return history, recorded
+
+
+def _clone(item, cycle, day):
+    """复制一条记录：换成新的日期，并在 urlbase 的名称后加上轮次，保证 url / hsh 不重复"""
+    item = copy.copy(item)
+    name, suffix = item["urlbase"].split('_', 1)
+    urlbase = f"{name}{cycle}_{suffix}"
+    item["url"] = item["url"].replace(item["urlbase"], urlbase, 1)
+    item["urlbase"] = urlbase
+    item["startdate"] = day.strftime('%Y%m%d')
+    item["enddate"] = (day + timedelta(days=1)).strftime('%Y%m%d')
+    item["fullstartdate"] = item["startdate"] + item["fullstartdate"][8:]
+    item["hsh"] = hashlib.md5(urlbase.encode('utf-8')).hexdigest()
+    return item
+
+
+def build_archive(seed_images, size):
+    """
+    生成 size 条按日期倒序排列的合成历史：先是真实记录，之后循环复制真实记录，日期依次往前
+
+    :param seed_images: 真实记录（新到旧）
+    """
+    archive = list(seed_images[:size])
+    day = datetime.strptime(seed_images[-1]["startdate"], '%Y%m%d')
+    cycle = 1
+    while len(archive) < size:
+        for item in seed_images:
+            if len(archive) >= size:
+                break
+            day -= timedelta(days=1)
+            archive.append(_clone(item, cycle, day))
+        cycle += 1
+    return archive
+
+
+def build_fixture(region, size):
+    """
+    :return: dict(archive=完整历史, stored=入库后的完整历史（带有算好的地址）,
+                  response=回放的 API 响应（最新的 8 张）, history=已有历史（其余部分）, update=上一次的 API 响应)
+    """
+    history, recorded = load_source(region)
+    archive = build_archive(history["data"], size)
+    return {
+        "region": region,
+        "size": size,
+        "archive": archive,
+        "stored": [image_urls.with_urls(item) for item in archive],
+        "response": dict(recorded, images=archive[:RESPONSE_SIZE]),
+        "history": archive[RESPONSE_SIZE:],
+        "update": dict(recorded, images=archive[RESPONSE_SIZE:RESPONSE_SIZE * 2]),
+        "header": {k: v for k, v in history.items() if k != 'data'},
+    }
+
+
+def write_data_dir(fixture, data_dir):
+    """把 fixture 写成 main.main 运行前的 data 目录：{region}_all.json、{region}_update.json 和 daily_log"""
+    region = fixture["region"]
+    os.makedirs(os.path.join(data_dir, f'{region}_daily_log'), exist_ok=True)
+    all_json = dict(fixture["header"], Total=len(fixture["history"]), data=fixture["history"])
+    with open(os.path.join(data_dir, f'{region}_all.json'), 'w', encoding='utf-8') as f:
+        json.dump(all_json, f, ensure_ascii=False, indent=4)
+    with open(os.path.join(data_dir, f'{region}_update.json'), 'w', encoding='utf-8') as f:
+        json.dump(fixture["update"], f, ensure_ascii=False, indent=4)
+
+
+class ReplayAdapter(BaseAdapter):
+    """把请求回放为录制的响应，不访问网络"""
+
+    def __init__(self, payload):
+        super().__init__()
+        self.body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.requests = 0
+
+    def send(self, request, **kwargs):
+        self.requests += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        response._content = self.body
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
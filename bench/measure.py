@@ -0,0 +1,135 @@
+# coding:utf-8
+"""
+计时、内存分配和 Redis 往返次数的统计
+"""
+import contextlib
+import io
+import statistics
+import threading
+import time
+import tracemalloc
+
+import redis.asyncio.connection
+import redis.connection
+
+
+class RedisCounter:
+    """
+    统计期间所有 Redis 连接（同步和 redis.asyncio）的往返次数、命令数和发送字节数
+
+    一次 send_packed_command 算一次往返：单条命令和一整个 pipeline 都只发送一次
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        self.commands = 0
+        self.bytes_sent = 0
+        self._patched = []
+
+    def _record(self, round_trips=0, commands=0, packed=None):
+        if packed is not None:
+            size = len(packed) if isinstance(packed, (bytes, bytearray, memoryview)) else sum(len(p) for p in packed)
+        else:
+            size = 0
+        with self.lock:
+            self.round_trips += round_trips
+            self.commands += commands
+            self.bytes_sent += size
+
+    def _patch(self, cls, name, wrapper):
+        # 方法可能定义在基类上，替换时只遮蔽子类上的属性，退出时再删除
+        self._patched.append((cls, name, cls.__dict__.get(name)))
+        setattr(cls, name, wrapper(getattr(cls, name)))
+
+    def __enter__(self):
+        counter = self
+
+        def sync_send_packed(original):
+            def send_packed_command(self, command, check_health=True):
+                counter._record(round_trips=1, packed=command)
+                return original(self, command, check_health)
+            return send_packed_command
+
+        def async_send_packed(original):
+            async def send_packed_command(self, command, check_health=True):
+                counter._record(round_trips=1, packed=command)
+                return await original(self, command, check_health)
+            return send_packed_command
+
+        def sync_send_command(original):
+            def send_command(self, *args, **kwargs):
+                counter._record(commands=1)
+                return original(self, *args, **kwargs)
+            return send_command
+
+        def async_send_command(original):
+            async def send_command(self, *args, **kwargs):
+                counter._record(commands=1)
+                return await original(self, *args, **kwargs)
+            return send_command
+
+        def pack_commands(original):
+            def wrapper(self, commands):
+                commands = list(commands)
+                counter._record(commands=len(commands))
+                return original(self, commands)
+            return wrapper
+
+        for cls, send_packed, send_command in (
+                (redis.connection.Connection, sync_send_packed, sync_send_command),
+                (redis.asyncio.connection.Connection, async_send_packed, async_send_command)):
+            self._patch(cls, 'send_packed_command', send_packed)
+            self._patch(cls, 'send_command', send_command)
+            self._patch(cls, 'pack_commands', pack_commands)
+        return self
+
+    def __exit__(self, *exc):
+        while self._patched:
+            cls, name, original = self._patched.pop()
+            if original is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, original)
+        return False
+
+    def as_dict(self):
+        return {"round_trips": self.round_trips, "commands": self.commands, "bytes_sent": self.bytes_sent}
+
+
+def measure(func, repeat=5, setup=None, quiet=True):
+    """
+    执行 func：先 repeat 次计时，再单独执行一次统计内存分配（tracemalloc 会拖慢计时）和 Redis 往返
+
+    :param setup: 每次执行前调用（不计时），用于恢复初始状态
+    :param quiet: 丢弃被测函数的 print 输出
+    :return: 统计结果 dict
+    """
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    timings = []
+    with output:
+        for _ in range(repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            with RedisCounter() as counter:
+                func()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    result = {
+        "median_ms": round(statistics.median(timings), 3) if timings else None,
+        "min_ms": round(min(timings), 3) if timings else None,
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(current / 1024, 1),
+    }
+    result.update(counter.as_dict())
+    return result
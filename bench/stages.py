@@ -0,0 +1,208 @@
+# coding:utf-8
+"""
+各个被测路径：抓取入库（main.main）、补抓（ALL.backfill）、发布到 Redis（post_to_redis）和 API 路由（api/*.py）
+"""
+import io
+import os
+import shutil
+import sys
+
+from bench.archive_server import ArchiveServer
+from bench.fixtures import ROOT, RESPONSE_SIZE, ReplayAdapter, write_data_dir
+from bench.measure import measure
+
+sys.path.insert(0, ROOT)
+import ALL
+import compact_archive
+import crawler
+import history_store
+import main
+import post_to_redis
+
+# backfill 阶段缺少的天数（每日运行一次只能补 8 天）
+BACKFILL_GAP = 40
+
+# (名称, 处理程序所在模块, 请求路径)，{middle} 替换为历史中间的位置，{middle_date} 替换为该位置的 startdate
+API_ROUTES = [
+    ("index", "index", "/"),
+    ("random", "index", "/random"),
+    ("page", "images", "/api/images?limit=50"),
+    ("page_middle", "images", "/api/images?offset={middle}&limit=50"),
+    ("page_reverse", "images", "/api/images?sort=reverse&limit=50"),
+    ("page_random", "images", "/api/images?sort=random&limit=50"),
+    ("ndjson_all", "images", "/api/images?format=ndjson"),
+    ("latest", "images", "/api/images/latest"),
+    ("today", "images", "/api/images/today"),
+    ("position", "images", "/api/images/position/{middle}"),
+    ("date", "images", "/api/images/date/{middle_date}"),
+    ("date_range", "images", "/api/images/date?from={middle_date}&limit=30"),
+    ("search", "images", "/api/images/search?q=getty"),
+    ("search_cjk", "images", "/api/images/search?q=%E6%9D%BE%E9%BC%A0+%E8%8B%B1%E6%A0%BC%E5%85%B0&limit=10"),
+    ("debug", "debug", "/api/debug"),
+]
+
+
+def archive_lookup(region, startdate):
+    """打开 {region}_archive.bin，按日期和位置各查一次"""
+    with compact_archive.CompactArchive.open(region) as archive:
+        assert archive.find_date(startdate) is not None
+        return archive[0]
+
+
+def bench_ingest(fixture, work_dir, repeat):
+    """回放录制的 HPImageArchive 响应跑 main.main，以及之后的导出和读取"""
+    region = fixture["region"]
+    template_dir = os.path.join(work_dir, 'template')
+    data_dir = os.path.join(work_dir, 'data')
+    write_data_dir(fixture, template_dir)
+    history_store.DATA_DIR = template_dir
+    # 迁移 {region}_all.json 到追加日志，不计入 main.main 的耗时
+    history_store.init_store(region)
+
+    adapter = ReplayAdapter(fixture["response"])
+    crawler.get_session().mount(crawler.BING_ARCHIVE_URL, adapter)
+    crawler.rate_limiter.min_interval = 0
+
+    middle_date = fixture["archive"][len(fixture["archive"]) // 2]["startdate"]
+
+    def reset():
+        shutil.rmtree(data_dir, ignore_errors=True)
+        shutil.copytree(template_dir, data_dir)
+        history_store.DATA_DIR = data_dir
+
+    def run_main():
+        new_images = main.main(region)
+        assert len(new_images) == RESPONSE_SIZE, len(new_images)
+
+    results = {
+        "ingest.main": measure(run_main, repeat, setup=reset),
+        "ingest.export_all_json": measure(lambda: history_store.export_all_json(region), repeat),
+        "ingest.load_images": measure(lambda: history_store.load_images(region), repeat),
+        "ingest.export_archive": measure(lambda: compact_archive.export_archive(region), repeat),
+        "ingest.archive_lookup": measure(lambda: archive_lookup(region, middle_date), repeat),
+    }
+    results["ingest.main"]["http_requests"] = adapter.requests
+    return results
+
+
+def bench_backfill(fixture, work_dir, r, repeat, gap=BACKFILL_GAP):
+    """历史缺少最近 gap 天时，用 ALL.backfill 从本地 HPImageArchive 替身一次补齐"""
+    region = fixture["region"]
+    template_dir = os.path.join(work_dir, 'backfill_template')
+    data_dir = os.path.join(work_dir, 'backfill_data')
+    # 结束后恢复，publish 阶段读取 ingest 阶段写下的 {region}_temp.json
+    previous_data_dir = history_store.DATA_DIR
+    write_data_dir(dict(fixture, history=fixture["archive"][gap:]), template_dir)
+    history_store.DATA_DIR = template_dir
+    history_store.init_store(region)
+
+    envelope = {k: v for k, v in fixture["response"].items() if k != "images"}
+    server = ArchiveServer({region: (envelope, fixture["archive"])})
+    stop = server.start()
+    crawler.rate_limiter.min_interval = 0
+
+    def reset():
+        shutil.rmtree(data_dir, ignore_errors=True)
+        shutil.copytree(template_dir, data_dir)
+        history_store.DATA_DIR = data_dir
+        r.flushdb()
+
+    def run_backfill():
+        counts, failed = ALL.backfill([region], max_idx=gap - 1, base_url=server.base_url, r=r)
+        assert not failed and counts[region] == gap, (counts, failed)
+
+    try:
+        requests_before = server.requests
+        result = measure(run_backfill, repeat, setup=reset)
+        result["http_requests"] = (server.requests - requests_before) // (repeat + 1)
+    finally:
+        stop()
+        history_store.DATA_DIR = previous_data_dir
+    return {f"backfill.gap_{gap}": result}
+
+
+def bench_publish(fixture, r, repeat):
+    """通过 post_to_redis 写入 Redis：全量回填（空库 / 已存在）和每日发布"""
+    archive = fixture["stored"]
+
+    def flush():
+        r.flushdb()
+
+    results = {
+        "publish.backfill_cold": measure(lambda: post_to_redis.publish_images(r, archive), repeat, setup=flush),
+        "publish.backfill_warm": measure(lambda: post_to_redis.publish_images(r, archive), repeat),
+        # 读取 ingest 阶段写下的 {region}_temp.json
+        "publish.daily": measure(lambda: post_to_redis.main(fixture["region"], r), repeat),
+    }
+    return results
+
+
+def seed_api_data(fixture, r):
+    """准备 API 读取的数据：bing_images、wallpapers:index 和搜索索引"""
+    archive = fixture["stored"]
+    r.flushdb()
+    post_to_redis.publish_images(r, archive)
+    post_to_redis.index_images(r, fixture["region"], archive)
+
+
+class _Connection:
+    """给 BaseHTTPRequestHandler 用的内存连接：读取写好的请求，收集响应"""
+
+    def __init__(self, raw_request):
+        self.rfile = io.BytesIO(raw_request)
+        self.sent = bytearray()
+
+    def makefile(self, mode, bufsize=None):
+        return self.rfile
+
+    def sendall(self, data):
+        self.sent += data
+
+
+def call_handler(handler_class, path):
+    """在进程内用一个请求驱动 handler_class，返回 (状态码, 响应字节数)"""
+    raw = "GET {} HTTP/1.1\r\nHost: bench\r\n\r\n".format(path).encode('latin-1')
+    connection = _Connection(raw)
+    handler_class(connection, ('127.0.0.1', 0), None)
+    status = int(connection.sent.split(b' ', 2)[1])
+    return status, len(connection.sent)
+
+
+def quiet_handler(handler_class):
+    class QuietHandler(handler_class):
+        def log_message(self, format, *args):
+            pass
+    return QuietHandler
+
+
+def bench_api(fixture, r, repeat):
+    """逐个驱动 api/*.py 的路由：冷（清空进程内缓存后的首个请求）和热两种情况"""
+    sys.path.insert(0, os.path.join(ROOT, 'api'))
+    import _cache
+    import debug
+    import images
+    import index
+
+    handlers = {
+        "images": quiet_handler(images.Handler),
+        "index": quiet_handler(index.handler),
+        "debug": quiet_handler(debug.handler),
+    }
+    seed_api_data(fixture, r)
+    middle = len(fixture["archive"]) // 2
+
+    results = {}
+    for name, module, path in API_ROUTES:
+        path = path.format(middle=middle, middle_date=fixture["archive"][middle]["startdate"])
+        handler_class = handlers[module]
+        status, size = call_handler(handler_class, path)
+        if status >= 500:
+            raise RuntimeError("{} 返回 {}".format(path, status))
+
+        def request(handler_class=handler_class, path=path):
+            call_handler(handler_class, path)
+
+        results[f"api.{name}.cold"] = measure(request, repeat, setup=_cache.response_cache.clear)
+        results[f"api.{name}.warm"] = measure(request, repeat)
+        results[f"api.{name}.warm"]["response_bytes"] = size
+    return results
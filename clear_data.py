@@ -3,7 +3,8 @@ import json
 import os
 import sys
 import shutil
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
 import re
 
@@ -11,20 +12,40 @@ import re
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 并发处理文件的线程数，--workers 1 时逐个处理
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# 流式读取 _all.json 时每次读取的字符数
+STREAM_CHUNK_SIZE = 1 << 16
 
-def create_backup(filepath, backup_dir='bak'):
+# 文件名中的日期格式，预先编译，按顺序匹配
+# 格式: de-DE_2022-05-05_14-19-25.json（daily_log，绝大多数文件）
+DAILY_LOG_PATTERN = re.compile(r'^[a-z]{2}-[A-Z]{2}_(\d{4})-(\d{2})-(\d{2})_\d{2}-\d{2}-\d{2}\.json$')
+DATE_PATTERNS = [
+    DAILY_LOG_PATTERN,
+    # 其他可能的日期格式（保留原有逻辑）
+    re.compile(r'(\d{4})(\d{2})(\d{2})'),  # YYYYMMDD
+    re.compile(r'(\d{4})-(\d{2})-(\d{2})'),  # YYYY-MM-DD
+    re.compile(r'(\d{4})_(\d{2})_(\d{2})'),  # YYYY_MM_DD
+    re.compile(r'(\d{4})\.(\d{2})\.(\d{2})'),  # YYYY.MM.DD
+]
+HISTORY_SUFFIX = '_history.jsonl'
+# compact_logs.py 生成的 daily_log 月度压缩包: zh-CN_2025-01.json.gz
+BUNDLE_PATTERN = re.compile(r'^[a-z]{2}-[A-Z]{2}_(\d{4})-(\d{2})\.json\.gz$')
+
+
+def create_backup(filepath, backup_dir='bak', data_dir='data'):
     """
     创建备份文件到指定目录，保持目录结构
     
     :param filepath: 原文件路径
     :param backup_dir: 备份目录
+    :param data_dir: 数据目录，备份路径相对于它
     :return: 备份文件路径，如果失败返回None
     """
     try:
         # 获取相对路径
-        if filepath.startswith('data/'):
-            relative_path = filepath[5:]  # 去掉 'data/' 前缀
-        else:
+        relative_path = os.path.relpath(filepath, data_dir)
+        if relative_path.startswith('..'):
             relative_path = os.path.basename(filepath)
         
         backup_path = os.path.join(backup_dir, relative_path + '.bak')
@@ -47,27 +68,12 @@ def extract_date_from_filename(filename):
     从文件名中提取日期
     支持格式：de-DE_2022-05-05_14-19-25.json
     """
-    # 匹配语言代码_YYYY-MM-DD_HH-MM-SS.json 格式
-    patterns = [
-        # 格式: de-DE_2022-05-05_14-19-25.json
-        r'^[a-z]{2}-[A-Z]{2}_(\d{4})-(\d{2})-(\d{2})_\d{2}-\d{2}-\d{2}\.json$',
-        # 格式: en-US_2023-12-31_23-59-59.json
-        r'^[a-z]{2}-[A-Z]{2}_(\d{4})-(\d{2})-(\d{2})_\d{2}-\d{2}-\d{2}\.json$',
-        # 其他可能的日期格式（保留原有逻辑）
-        r'(\d{4})(\d{2})(\d{2})',  # YYYYMMDD
-        r'(\d{4})-(\d{2})-(\d{2})',  # YYYY-MM-DD
-        r'(\d{4})_(\d{2})_(\d{2})',  # YYYY_MM_DD
-        r'(\d{4})\.(\d{2})\.(\d{2})',  # YYYY.MM.DD
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, filename)
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(filename)
         if match:
             try:
-                if len(match.groups()) == 3:
-                    year, month, day = match.groups()
-                    date_obj = datetime.strptime(f"{year}-{month}-{day}", '%Y-%m-%d').date()
-                    return date_obj
+                year, month, day = match.groups()
+                return datetime.strptime(f"{year}-{month}-{day}", '%Y-%m-%d').date()
             except ValueError:
                 continue
     
@@ -98,102 +104,332 @@ def should_keep_item(item, date_field, target_date):
     return True
 
 
-def process_json_file(filepath, target_date, backup=True):
+class JsonArrayStream:
+    """
+    流式读取形如 {..., "data": [{...}, {...}], ...} 的 JSON 文件：
+    data 之前和之后的字段一次性解析，data 中的元素用 raw_decode 逐个解析，内存占用与文件大小无关
+    """
+
+    def __init__(self, f, key):
+        self.f = f
+        self.key = key
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.head = None
+        self.tail = None
+
+    def _fill(self):
+        chunk = self.f.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def _read_head(self):
+        pattern = re.compile(r'"{}"\s*:\s*\['.format(re.escape(self.key)))
+        while True:
+            match = pattern.search(self.buffer)
+            if match:
+                # data 之前的字段：去掉末尾的逗号后补上 }
+                self.head = json.loads(self.buffer[:match.start()].rstrip().rstrip(',') + '}')
+                self.pos = match.end()
+                return
+            if not self._fill():
+                raise ValueError(f"未找到 {self.key} 字段")
+
+    def __iter__(self):
+        self._read_head()
+        self._skip_whitespace()
+        if self.buffer[self.pos:self.pos + 1] == ']':
+            self.pos += 1
+        else:
+            while True:
+                while True:
+                    try:
+                        item, end = self.decoder.raw_decode(self.buffer, self.pos)
+                        break
+                    except json.JSONDecodeError:
+                        # 元素不完整，继续读取
+                        if not self._fill():
+                            raise
+                self.pos = end
+                yield item
+                self._skip_whitespace()
+                separator = self.buffer[self.pos:self.pos + 1]
+                self.pos += 1
+                if separator == ']':
+                    break
+                if separator != ',':
+                    raise ValueError(f"{self.key} 中出现意外的字符: {separator!r}")
+                self._skip_whitespace()
+        # data 之后的字段
+        while self._fill():
+            pass
+        rest = self.buffer[self.pos:].strip()
+        self.tail = json.loads('{' + rest.lstrip(',')) if rest != '}' else {}
+
+
+def _indent_lines(text, prefix):
+    return '\n'.join(prefix + line for line in text.split('\n'))
+
+
+def write_streamed_json(f, head, key, items, tail):
+    """
+    逐条写出 {**head, key: items, **tail}，输出与 json.dump(..., ensure_ascii=False, indent=4) 一致
+
+    :return: 写入的条目数
+    """
+    def dump_field(name, value):
+        return '    {}: {}'.format(json.dumps(name, ensure_ascii=False),
+                                   json.dumps(value, ensure_ascii=False, indent=4).replace('\n', '\n    '))
+
+    f.write('{\n')
+    for name, value in head.items():
+        f.write(dump_field(name, value) + ',\n')
+    f.write('    {}: ['.format(json.dumps(key, ensure_ascii=False)))
+    count = 0
+    for item in items:
+        f.write(',\n' if count else '\n')
+        f.write(_indent_lines(json.dumps(item, ensure_ascii=False, indent=4), '        '))
+        count += 1
+    f.write('\n    ]' if count else ']')
+    for name, value in tail.items():
+        f.write(',\n' + dump_field(name, value))
+    f.write('\n}')
+    return count
+
+
+def bundle_end_date(filename):
+    """月度压缩包中最后一天的日期，不是压缩包时返回 None"""
+    match = BUNDLE_PATTERN.match(filename)
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    return (next_month - timedelta(days=1)).date()
+
+
+def classify_file(filename):
+    """
+    只根据文件名决定如何处理
+
+    :return: "all" / "update" / "history" / "header"（随 history 一起处理）/ "dated" / "no_date" / "bundle"
+    """
+    if filename.endswith('.json.gz'):
+        return "bundle" if BUNDLE_PATTERN.match(filename) else None
+    if filename.endswith('_all.json'):
+        return "all"
+    if filename.endswith('_update.json'):
+        return "update"
+    if filename.endswith(HISTORY_SUFFIX):
+        return "history"
+    if filename.endswith('_history.json'):
+        return "header"
+    if filename.endswith('.json'):
+        return "dated" if extract_date_from_filename(filename) else "no_date"
+    return None
+
+
+def filter_all_json(filepath, target_date, dry_run=False, backup=False, data_dir='data'):
+    """
+    流式过滤 _all.json：第一遍只统计保留的条数，有需要移除的条目时第二遍流式写入临时文件并替换
+
+    :param backup: 替换前备份原文件（没有变化的文件不备份）
+    :return: (原始记录数, 过滤后记录数)
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        stream = JsonArrayStream(f, 'data')
+        original_count = 0
+        filtered_count = 0
+        for item in stream:
+            original_count += 1
+            if should_keep_item(item, 'enddate', target_date):
+                filtered_count += 1
+    if dry_run or filtered_count == original_count:
+        return original_count, filtered_count
+
+    head = dict(stream.head)
+    if 'Total' in head:
+        head['Total'] = filtered_count
+    tmp_path = filepath + '.tmp'
+    with open(filepath, 'r', encoding='utf-8') as src, open(tmp_path, 'w', encoding='utf-8') as dst:
+        items = (item for item in JsonArrayStream(src, 'data') if should_keep_item(item, 'enddate', target_date))
+        write_streamed_json(dst, head, 'data', items, stream.tail)
+    if backup:
+        create_backup(filepath, 'bak', data_dir)
+    os.replace(tmp_path, filepath)
+    return original_count, filtered_count
+
+
+def filter_update_json(filepath, target_date, dry_run=False, backup=False, data_dir='data'):
+    """过滤 _update.json（只有几条记录，直接整体读取），有变化时先备份再写入"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    images = data.get('images', [])
+    filtered_images = [item for item in images if should_keep_item(item, 'startdate', target_date)]
+    if not dry_run and len(filtered_images) != len(images):
+        data['images'] = filtered_images
+        if backup:
+            create_backup(filepath, 'bak', data_dir)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+    return len(images), len(filtered_images)
+
+
+def filter_history(filepath, target_date, dry_run=False, backup=True, data_dir='data'):
     """
-    处理单个JSON文件
+    过滤追加日志 {region}_history.jsonl 并更新头文件，否则下次导出 _all.json 时被清除的记录会重新出现。
+    键索引和二进制归档由日志派生，直接删除，下次使用时重建
+
+    :return: (原始记录数, 过滤后记录数)
+    """
+    header_file = filepath[:-len(HISTORY_SUFFIX)] + '_history.json'
+    with open(header_file, 'r', encoding='utf-8') as f:
+        header = json.load(f)
+
+    def committed_lines(f):
+        # 只读取头文件确认过的部分
+        remaining = header["Size"]
+        for line in f:
+            remaining -= len(line)
+            if remaining < 0:
+                break
+            yield line
+
+    original_count = 0
+    filtered_count = 0
+    latest = None
+    tmp_path = filepath + '.tmp'
+    with open(filepath, 'rb') as src:
+        dst = None if dry_run else open(tmp_path, 'wb')
+        try:
+            for line in committed_lines(src):
+                original_count += 1
+                item = json.loads(line)
+                if should_keep_item(item, 'enddate', target_date):
+                    filtered_count += 1
+                    latest = max(latest or item["startdate"], item["startdate"])
+                    if dst is not None:
+                        dst.write(line)
+            size = dst.tell() if dst is not None else None
+        finally:
+            if dst is not None:
+                dst.close()
+
+    if dry_run or filtered_count == original_count:
+        if not dry_run:
+            os.remove(tmp_path)
+        return original_count, filtered_count
+
+    if backup:
+        create_backup(filepath, 'bak', data_dir)
+        create_backup(header_file, 'bak', data_dir)
+    os.replace(tmp_path, filepath)
+    header.update(Total=filtered_count, Size=size, Latest=latest)
+    # 日志被重写，记录的导出位置失效，下次运行重新全量导出
+    header.pop("Exports", None)
+    tmp_header = header_file + '.tmp'
+    with open(tmp_header, 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_header, header_file)
+    region_prefix = filepath[:-len(HISTORY_SUFFIX)]
+    for derived in (region_prefix + '_history.keys', region_prefix + '_archive.bin'):
+        if os.path.exists(derived):
+            os.remove(derived)
+    return original_count, filtered_count
+
+
+def process_json_file(filepath, target_date, backup=True, dry_run=False, data_dir='data'):
+    """
+    处理单个文件
     
     :return: (是否成功, 原始记录数, 过滤后记录数, 文件类型)
     """
     try:
         # 获取文件名
         filename = os.path.basename(filepath)
+        kind = classify_file(filename)
         
-        # 首先检查是否是特殊格式文件（_all.json 或 _update.json）
-        is_special_file = filename.endswith('_all.json') or filename.endswith('_update.json')
-        
-        # 创建备份
-        backup_created = False
-        if backup:
-            backup_path = create_backup(filepath, 'bak')
-            backup_created = backup_path is not None
-        
-        # 如果是特殊文件，处理内容；否则根据文件名日期判断
-        if is_special_file:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            original_count = 0
-            filtered_count = 0
-            file_type = "unknown"
-            
-            # 根据文件类型处理数据
-            if 'data' in data:  # _all.json 类型文件
-                file_type = "all"
-                original_count = len(data.get('data', []))
-                filtered_data = []
-                
-                for item in data['data']:
-                    if should_keep_item(item, 'enddate', target_date):
-                        filtered_data.append(item)
-                
-                data['data'] = filtered_data
-                if 'Total' in data:
-                    data['Total'] = len(filtered_data)
-                filtered_count = len(filtered_data)
-                
-            elif 'images' in data:  # _update.json 类型文件
-                file_type = "update"
-                original_count = len(data.get('images', []))
-                filtered_images = []
-                
-                for item in data['images']:
-                    if should_keep_item(item, 'startdate', target_date):
-                        filtered_images.append(item)
-                
-                data['images'] = filtered_images
-                filtered_count = len(filtered_images)
-            
-            # 保存修改后的数据
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-            
+        if kind in ("all", "update", "history"):
+            # 只有确实需要改写时，才在改写前备份
+            filter_file = {"all": filter_all_json, "update": filter_update_json, "history": filter_history}[kind]
+            original_count, filtered_count = filter_file(filepath, target_date, dry_run, backup, data_dir)
+
             removed_count = original_count - filtered_count
-            backup_status = "已备份" if backup_created else "未备份"
-            logger.info(f"处理 {filename} ({file_type}): {original_count} -> {filtered_count} 条记录, 移除 {removed_count} 条 [{backup_status}]")
+            if dry_run:
+                backup_status = "演练"
+            elif not removed_count:
+                backup_status = "未修改"
+            else:
+                backup_status = "已备份" if backup else "未备份"
+            logger.info(f"处理 {filename} ({kind}): {original_count} -> {filtered_count} 条记录, 移除 {removed_count} 条 [{backup_status}]")
             
-            return True, original_count, filtered_count, file_type
+            return True, original_count, filtered_count, kind
             
         else:
-            # 普通JSON文件，根据文件名日期判断是否删除整个文件
-            file_date = extract_date_from_filename(filename)
-            if file_date:
-                if file_date < target_date:
+            # 普通JSON文件，根据文件名日期判断是否删除整个文件；整月早于目标日期的压缩包同样整个删除
+            file_date = bundle_end_date(filename) if kind == "bundle" else extract_date_from_filename(filename)
+            if file_date and file_date < target_date:
+                if not dry_run:
+                    if backup:
+                        create_backup(filepath, 'bak', data_dir)
                     # 删除整个文件
                     os.remove(filepath)
                     logger.info(f"删除文件 {filename} (文件日期: {file_date})")
-                    return True, 1, 0, "deleted"
-                else:
-                    # 保留文件
-                    logger.info(f"保留文件 {filename} (文件日期: {file_date})")
-                    return True, 1, 1, "retained"
-            else:
-                # 文件名中没有找到日期，保留文件
-                logger.info(f"保留文件 {filename} (未找到日期信息)")
-                return True, 1, 1, "no_date"
+                return True, 1, 0, "deleted"
+            # 保留文件（日期不早于目标日期，或文件名中没有日期）
+            return True, 1, 1, "retained" if file_date else "no_date"
         
     except Exception as e:
         logger.error(f"处理文件 {filepath} 时出错: {e}")
         return False, 0, 0, "error"
 
 
-def clear_data_before_date(target_date_str, data_dir='data', backup=True):
+def plan_files(data_dir, target_date):
+    """
+    遍历数据目录，只根据文件名决定每个文件的处理方式，不打开文件
+
+    :return: (需要处理的文件列表, 保留的文件数)
+    """
+    tasks = []
+    retained = 0
+    for root, dirs, files in os.walk(data_dir):
+        for filename in files:
+            kind = classify_file(filename)
+            if kind in ("all", "update", "history"):
+                tasks.append(os.path.join(root, filename))
+            elif kind in ("dated", "bundle"):
+                file_date = extract_date_from_filename(filename) if kind == "dated" else bundle_end_date(filename)
+                if file_date < target_date:
+                    tasks.append(os.path.join(root, filename))
+                else:
+                    retained += 1
+            elif kind == "no_date":
+                retained += 1
+    return tasks, retained
+
+
+def clear_data_before_date(target_date_str, data_dir='data', backup=True, workers=DEFAULT_WORKERS, dry_run=False):
     """
     清除 data 目录下 JSON 文件中标题日期在指定日期之前的条目
-    支持子目录和普通JSON文件
+    支持子目录和普通JSON文件，多个文件由线程池并发处理
     
     :param target_date_str: 指定日期字符串，格式为 'YYYY-MM-DD'
     :param data_dir: 数据目录路径
     :param backup: 是否创建备份文件
+    :param workers: 并发处理的线程数
+    :param dry_run: 只统计并列出将要移除的内容，不修改任何文件
     """
     # 验证目录存在
     if not os.path.exists(data_dir):
@@ -206,33 +442,43 @@ def clear_data_before_date(target_date_str, data_dir='data', backup=True):
         logger.error(f"日期格式错误: {e}")
         return False
     
-    processed_files = 0
+    tasks, retained_files = plan_files(data_dir, target_date)
+    processed_files = retained_files
     total_removed_records = 0
-    deleted_files = 0
-    retained_files = 0
+    deleted_files = []
+    filtered_files = []
     
-    # 递归遍历 data 目录下的所有 JSON 文件
-    for root, dirs, files in os.walk(data_dir):
-        for filename in files:
-            if filename.endswith('.json'):
-                filepath = os.path.join(root, filename)
-                
-                success, original_count, filtered_count, file_type = process_json_file(
-                    filepath, target_date, backup
-                )
-                
-                if success:
-                    processed_files += 1
-                    if file_type == "deleted":
-                        deleted_files += 1
-                    elif file_type in ["retained", "no_date"]:
-                        retained_files += 1
-                    else:
-                        total_removed_records += (original_count - filtered_count)
+    def process(filepath):
+        return filepath, process_json_file(filepath, target_date, backup, dry_run, data_dir)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for filepath, (success, original_count, filtered_count, file_type) in executor.map(process, tasks):
+            if not success:
+                continue
+            processed_files += 1
+            if file_type == "deleted":
+                deleted_files.append(filepath)
+            elif file_type in ["retained", "no_date"]:
+                retained_files += 1
+            else:
+                removed = original_count - filtered_count
+                total_removed_records += removed
+                if removed:
+                    filtered_files.append((filepath, original_count, filtered_count))
     
+    if dry_run:
+        print(f"\n演练结果（未修改任何文件）:")
+        print(f"  将删除 {len(deleted_files)} 个文件:")
+        for filepath in sorted(deleted_files):
+            print(f"    - {filepath}")
+        print(f"  将从 {len(filtered_files)} 个文件中移除 {total_removed_records} 条记录:")
+        for filepath, original_count, filtered_count in sorted(filtered_files):
+            print(f"    - {filepath}: {original_count} -> {filtered_count}")
+        return True
+
     # 输出汇总信息
     logger.info(f"处理完成: 共处理 {processed_files} 个文件")
-    logger.info(f"- 删除 {deleted_files} 个文件")
+    logger.info(f"- 删除 {len(deleted_files)} 个文件")
     logger.info(f"- 保留 {retained_files} 个文件")
     logger.info(f"- 移除 {total_removed_records} 条记录")
     
@@ -304,7 +550,6 @@ def show_sample_files(data_dir='data'):
     for root, dirs, files in os.walk(data_dir):
         for filename in files:
             if filename.endswith('.json'):
-                filepath = os.path.join(root, filename)
                 file_date = extract_date_from_filename(filename)
                 date_info = f"日期: {file_date}" if file_date else "未识别到日期"
                 
@@ -334,26 +579,37 @@ def main():
         print("示例: python clear_data.py 2025-01-01 /path/to/data")
         print("\n选项:")
         print("  --no-backup    不创建备份文件")
+        print("  --dry-run      只列出将要删除的文件和移除的记录数，不修改任何文件")
+        print(f"  --workers N    并发处理的线程数（默认 {DEFAULT_WORKERS}，1 为逐个处理）")
         print("\n功能说明:")
-        print("  - 处理 _all.json 和 _update.json 文件：根据内容中的日期过滤条目")
-        print("  - 处理其他 .json 文件：根据文件名中的日期决定是否删除整个文件")
+        print("  - 处理 _all.json 和 _update.json 文件：根据内容中的日期过滤条目（_all.json 流式读写）")
+        print("  - 处理 _history.jsonl 追加日志：过滤条目并更新头文件，派生的索引和归档在下次使用时重建")
+        print("  - 处理其他 .json 文件：根据文件名中的日期决定是否删除整个文件（不打开文件）")
+        print("  - 处理 daily_log 的月度压缩包：整月早于指定日期时删除")
         print("  - 支持 de-DE_2022-05-05_14-19-25.json 格式的文件名")
         print("  - 支持子目录递归处理")
         print("  - 备份文件保存在 bak 目录，保持原目录结构")
         sys.exit(1)
     
-    target_date = sys.argv[1]
-    data_dir = sys.argv[2] if len(sys.argv) > 2 else 'data'
+    args = sys.argv[1:]
     backup = True
+    dry_run = False
+    workers = DEFAULT_WORKERS
     
-    # 检查是否包含 --no-backup 参数
-    if '--no-backup' in sys.argv:
+    # 检查是否包含 --no-backup 参数，从参数列表中移除，避免影响其他参数解析
+    if '--no-backup' in args:
         backup = False
-        # 从参数列表中移除，避免影响其他参数解析
-        sys.argv.remove('--no-backup')
-        # 重新调整数据目录参数
-        if len(sys.argv) > 2:
-            data_dir = sys.argv[2]
+        args.remove('--no-backup')
+    if '--dry-run' in args:
+        dry_run = True
+        args.remove('--dry-run')
+    if '--workers' in args:
+        pos = args.index('--workers')
+        workers = int(args[pos + 1])
+        del args[pos:pos + 2]
+    
+    target_date = args[0]
+    data_dir = args[1] if len(args) > 1 else 'data'
     
     if not validate_date(target_date):
         print("错误: 日期格式不正确，请使用 YYYY-MM-DD 格式")
@@ -367,7 +623,12 @@ def main():
     print(f"  - 目标日期: {target_date}")
     print(f"  - 数据目录: {data_dir}")
     print(f"  - 备份模式: {'开启 (备份到 bak 目录)' if backup else '关闭'}")
-    print(f"  - 处理范围: 所有子目录中的 .json 文件")
+    print(f"  - 处理范围: 所有子目录中的 .json 文件和 _history.jsonl")
+    print(f"  - 并发线程: {workers}")
+    
+    if dry_run:
+        success = clear_data_before_date(target_date, data_dir, backup, workers, dry_run=True)
+        sys.exit(0 if success else 1)
     
     # 确认操作
     confirm = input(f"\n确定要继续吗？(y/N): ")
@@ -375,7 +636,7 @@ def main():
         print("操作已取消")
         sys.exit(0)
     
-    success = clear_data_before_date(target_date, data_dir, backup)
+    success = clear_data_before_date(target_date, data_dir, backup, workers)
     
     if success:
         print(f"\n✓ 已清除 {target_date} 之前的日期数据")
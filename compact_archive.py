@@ -0,0 +1,237 @@
+# coding:utf-8
+"""
+紧凑的二进制列式归档 data/{region}_archive.bin
+
+{region}_all.json 带缩进、每条记录 14 个字段，读取任何一条都要解析整个文件。
+这里只保留 startdate、urlbase、title、copyright 四列，以及入库时由 image_urls 算好、
+随记录存入历史日志的 uhd、fhd、thumb 三种图片地址：startdate 是 uint32 数组，其余各列是指向字符串表的
+uint32 下标（重复的标题、版权信息只存一份）。
+文件可以直接 mmap，按位置或日期查询时只解码用到的字符串，读取方不再拼接地址。
+
+文件布局（各段按 8 字节对齐）:
+    头部        MAGIC, 版本, 字节序, 记录数, 字符串数, 各段的文件偏移
+    startdate   uint32 * 记录数（新 -> 旧，与 _all.json 的 data 顺序一致）
+    urlbase     uint32 * 记录数
+    title       uint32 * 记录数
+    copyright   uint32 * 记录数
+    uhd/fhd/thumb  各 uint32 * 记录数
+    字符串偏移  uint32 * (字符串数 + 1)
+    字符串数据  UTF-8
+
+用法:
+    python compact_archive.py export zh-CN [en-US ...]
+    python compact_archive.py get zh-CN 20251216|0
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+import history_store
+import image_urls
+
+MAGIC = b'BWCA'
+# 版本 2 增加了 uhd、fhd、thumb 三列
+FORMAT_VERSION = 2
+COLUMNS = ("startdate", "urlbase", "title", "copyright") + image_urls.VARIANTS
+STRING_COLUMNS = COLUMNS[1:]
+# MAGIC, 版本, 字节序（0 小端 / 1 大端）, 记录数, 字符串数, 各段偏移（除第一段外的列、字符串偏移、字符串数据）
+HEADER = struct.Struct('<4sHHII{}Q'.format(len(COLUMNS) + 1))
+
+
+def get_now_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+
+def archive_path(run_type):
+    return os.path.join(history_store.DATA_DIR, f'{run_type}_archive.bin')
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def pack_archive(images):
+    """
+    :param images: 新 -> 旧的图片记录列表
+    :return: 归档文件的 bytes
+    """
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        index = string_ids.get(value)
+        if index is None:
+            index = string_ids[value] = len(strings)
+            strings.append(value.encode('utf-8'))
+        return index
+
+    values = {name: [item.get(name) or "" for item in images] for name in STRING_COLUMNS}
+    columns = [array('I', (int(item["startdate"]) for item in images))]
+    for name in STRING_COLUMNS:
+        columns.append(array('I', map(intern, values[name])))
+
+    string_offsets = array('I', [0])
+    for value in strings:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    sections = [column.tobytes() for column in columns] + [string_offsets.tobytes(), b"".join(strings)]
+    positions = []
+    position = _align(HEADER.size)
+    for section in sections:
+        positions.append(position)
+        position = _align(position + len(section))
+
+    buffer = bytearray(position)
+    HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, 0 if sys.byteorder == 'little' else 1,
+                     len(images), len(strings), *positions[1:])
+    # 第一段（startdate）紧跟在头部之后，不需要记录偏移
+    for section, pos in zip(sections, positions):
+        buffer[pos:pos + len(section)] = section
+    return bytes(buffer)
+
+
+def export_archive(run_type, images=None):
+    """
+    从历史存储导出 {region}_archive.bin（先写临时文件再替换）
+
+    :param images: 刚从当前历史存储读取的记录（新 -> 旧），为空时自行读取
+    """
+    header = history_store.init_store(run_type)
+    if images is None:
+        images = history_store.load_images(run_type)
+    _path = archive_path(run_type)
+    tmp_path = _path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(pack_archive(images))
+    os.replace(tmp_path, _path)
+    history_store.mark_exported(run_type, 'archive', header)
+    print("[{}] 导出 {}_archive.bin 成功，共 {} 条，{} 字节".format(
+        get_now_time(), run_type, len(images), os.path.getsize(_path)))
+    return _path
+
+
+class CompactArchive:
+    """
+    只读加载 {region}_archive.bin：文件被 mmap，打开时只读取头部，查询时按需解码
+
+    archive = CompactArchive.open('zh-CN')
+    archive[0]                     # 最新一条
+    archive.find_date('20251216')  # 按日期查询，不存在时返回 None
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # 先只检查 MAGIC 和版本，旧版本的头部长度不同
+        if len(self._mmap) < HEADER.size or self._mmap[:6] != MAGIC + struct.pack('<H', FORMAT_VERSION):
+            self._mmap.close()
+            raise ValueError(f"{path} 不是版本 {FORMAT_VERSION} 的归档文件")
+        _, _, byteorder, self.count, string_count, *positions = HEADER.unpack_from(self._mmap, 0)
+        self._swap = byteorder != (0 if sys.byteorder == 'little' else 1)
+        # 指向 mmap 的 memoryview，关闭前必须全部释放
+        self._views = [memoryview(self._mmap)]
+        column_positions = [_align(HEADER.size)] + positions[:-2]
+        self._columns = [self._uint32(pos, self.count) for pos in column_positions]
+        self._string_offsets = self._uint32(positions[-2], string_count + 1)
+        self._string_data = self._view(positions[-1], len(self._mmap))
+
+    @classmethod
+    def open(cls, run_type):
+        return cls(archive_path(run_type))
+
+    @classmethod
+    def open_or_export(cls, run_type):
+        """文件不存在或是旧版本时先从历史存储重新导出"""
+        try:
+            return cls.open(run_type)
+        except (FileNotFoundError, ValueError):
+            export_archive(run_type)
+            return cls.open(run_type)
+
+    def _view(self, start, end):
+        view = self._views[0][start:end]
+        self._views.append(view)
+        return view
+
+    def _uint32(self, pos, count):
+        data = self._view(pos, pos + 4 * count)
+        if not self._swap:
+            values = data.cast('I')
+            self._views.append(values)
+            return values
+        # 在字节序不同的机器上生成的文件：复制一份并转换
+        values = array('I', data.tobytes())
+        values.byteswap()
+        return values
+
+    def close(self):
+        self._columns = self._string_offsets = self._string_data = None
+        while self._views:
+            self._views.pop().release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def string(self, index):
+        start, end = self._string_offsets[index], self._string_offsets[index + 1]
+        return str(self._string_data[start:end], 'utf-8')
+
+    def startdate(self, index):
+        return str(self._columns[0][index])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        item = {"startdate": self.startdate(index)}
+        for name, column in zip(STRING_COLUMNS, self._columns[1:]):
+            item[name] = self.string(column[index])
+        return item
+
+    def index_of(self, startdate):
+        """二分查找 startdate（记录按日期降序），不存在时返回 None"""
+        target = int(startdate)
+        dates = self._columns[0]
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if dates[mid] > target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and dates[lo] == target:
+            return lo
+        return None
+
+    def find_date(self, startdate):
+        index = self.index_of(startdate)
+        return None if index is None else self[index]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == 'export':
+        for region in sys.argv[2:]:
+            export_archive(region)
+    elif len(sys.argv) == 4 and sys.argv[1] == 'get':
+        with CompactArchive.open(sys.argv[2]) as archive:
+            key = sys.argv[3]
+            # 8 位数字视为日期，否则视为位置
+            item = archive.find_date(key) if len(key) == 8 and key.isdigit() else archive[int(key)]
+        print(json.dumps(item, ensure_ascii=False, indent=4))
+    else:
+        print("用法: python compact_archive.py export <地区> [地区 ...] | get <地区> <日期或位置>")
+        sys.exit(1)
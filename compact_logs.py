@@ -0,0 +1,205 @@
+# coding:utf-8
+"""
+把 data/{region}_daily_log/ 中每次运行保存的 API 响应按月合并为压缩包
+
+每天一个带缩进的完整响应，相邻几天的 8 张图片大部分重复。合并后每个月一个
+{region}_{YYYY-MM}.json.gz，同一 startdate 的图片记录只存一份（内容不同时另存一个版本），
+每次运行只记录用到的图片和其余字段（tooltips 等，同样去重）。
+index.json 记录每次运行所在的压缩包，load_run 可以还原任意一次运行的原始响应。
+
+用法:
+    python compact_logs.py compact [地区 ...] [--all]   # 默认只合并本月之前的文件，--all 包括本月
+    python compact_logs.py show <地区> <运行名>          # 如 zh-CN_2025-01-01_00-50-19
+"""
+import gzip
+import json
+import os
+import re
+import sys
+import time
+
+import history_store
+
+BUNDLE_VERSION = 1
+LOG_NAME_PATTERN = re.compile(r'^(?P<region>[a-z]{2}-[A-Z]{2})_(?P<month>\d{4}-\d{2})-\d{2}_\d{2}-\d{2}-\d{2}\.json$')
+
+
+def get_now_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+
+def log_dir(run_type):
+    return os.path.join(history_store.DATA_DIR, f'{run_type}_daily_log')
+
+
+def bundle_name(run_type, month):
+    return f'{run_type}_{month}.json.gz'
+
+
+def index_path(run_type):
+    return os.path.join(log_dir(run_type), 'index.json')
+
+
+def read_json_gz(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json_gz(path, data):
+    """mtime 固定为 0，内容相同时压缩结果也相同，避免在仓库中产生无意义的变更"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as f:
+            f.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    os.replace(tmp_path, path)
+
+
+def read_index(run_type):
+    if not os.path.exists(index_path(run_type)):
+        return {"Version": BUNDLE_VERSION, "Language": run_type, "runs": {}}
+    with open(index_path(run_type), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_index(run_type, index):
+    index["runs"] = dict(sorted(index["runs"].items()))
+    tmp_path = index_path(run_type) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, index_path(run_type))
+
+
+def new_bundle(run_type, month):
+    return {"Version": BUNDLE_VERSION, "Language": run_type, "Month": month, "images": {}, "extras": [], "runs": []}
+
+
+def add_run(bundle, name, data):
+    """把一次运行的响应加入压缩包，图片按 startdate 去重"""
+    keys = []
+    for image in data.get("images", []):
+        key = image["startdate"]
+        version = 1
+        # 同一天的记录内容有变化时（如 quiz、hs 字段更新）另存一个版本
+        while key in bundle["images"] and bundle["images"][key] != image:
+            version += 1
+            key = "{}.{}".format(image["startdate"], version)
+        bundle["images"][key] = image
+        keys.append(key)
+
+    # 其余字段保持原有顺序，images 的位置用 None 占位
+    extra = {k: (None if k == "images" else v) for k, v in data.items()}
+    try:
+        extra_index = bundle["extras"].index(extra)
+    except ValueError:
+        extra_index = len(bundle["extras"])
+        bundle["extras"].append(extra)
+    bundle["runs"].append({"name": name, "images": keys, "extra": extra_index})
+
+
+def rebuild_run(bundle, position):
+    """还原压缩包中第 position 次运行的原始响应"""
+    run = bundle["runs"][position]
+    images = [bundle["images"][key] for key in run["images"]]
+    return {k: (images if k == "images" else v) for k, v in bundle["extras"][run["extra"]].items()}
+
+
+def load_run(run_type, name):
+    """
+    读取一次运行的原始响应：尚未合并的直接读文件，否则从压缩包还原
+
+    :param name: 运行名，即原来的文件名去掉 .json，如 zh-CN_2025-01-01_00-50-19
+    :return: 响应内容，不存在时返回 None
+    """
+    loose_path = os.path.join(log_dir(run_type), name + '.json')
+    if os.path.exists(loose_path):
+        with open(loose_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    bundle_file = read_index(run_type)["runs"].get(name)
+    if bundle_file is None:
+        return None
+    bundle_path = os.path.join(log_dir(run_type), bundle_file)
+    if not os.path.exists(bundle_path):
+        return None  # 压缩包已被 clear_data.py 清除
+    bundle = read_json_gz(bundle_path)
+    for position, run in enumerate(bundle["runs"]):
+        if run["name"] == name:
+            return rebuild_run(bundle, position)
+    return None
+
+
+def compact(run_type, include_current=False):
+    """
+    合并一个地区的 daily_log，校验每次运行都能还原后才删除原文件
+
+    :param include_current: 是否包括本月（本月还会继续写入新文件）
+    :return: 合并的文件数
+    """
+    _dir = log_dir(run_type)
+    if not os.path.isdir(_dir):
+        return 0
+    current_month = time.strftime("%Y-%m", time.localtime())
+    by_month = {}
+    for filename in sorted(os.listdir(_dir)):
+        match = LOG_NAME_PATTERN.match(filename)
+        if not match or match.group('region') != run_type:
+            continue
+        if match.group('month') >= current_month and not include_current:
+            continue
+        by_month.setdefault(match.group('month'), []).append(filename)
+
+    index = read_index(run_type)
+    compacted = 0
+    for month, filenames in sorted(by_month.items()):
+        name = bundle_name(run_type, month)
+        path = os.path.join(_dir, name)
+        bundle = read_json_gz(path) if os.path.exists(path) else new_bundle(run_type, month)
+        existing = {run["name"] for run in bundle["runs"]}
+        originals = {}
+        for filename in filenames:
+            run_name = filename[:-len('.json')]
+            with open(os.path.join(_dir, filename), 'r', encoding='utf-8') as f:
+                originals[filename] = json.load(f)
+            if run_name not in existing:
+                add_run(bundle, run_name, originals[filename])
+        bundle["runs"].sort(key=lambda run: run["name"])
+        write_json_gz(path, bundle)
+
+        # 从写出的文件重新读取，确认每次运行都能原样还原
+        written = read_json_gz(path)
+        positions = {run["name"]: i for i, run in enumerate(written["runs"])}
+        for filename, original in originals.items():
+            run_name = filename[:-len('.json')]
+            if rebuild_run(written, positions[run_name]) != original:
+                raise ValueError(f"{filename} 无法从 {name} 还原，已停止")
+            index["runs"][run_name] = name
+        write_index(run_type, index)
+        for filename in filenames:
+            os.remove(os.path.join(_dir, filename))
+        compacted += len(filenames)
+        print("[{}] {} {}: 合并 {} 个文件，{} 张不重复的图片，{} 字节".format(
+            get_now_time(), run_type, month, len(filenames), len(written["images"]), os.path.getsize(path)))
+    return compacted
+
+
+def find_regions():
+    suffix = '_daily_log'
+    return sorted(name[:-len(suffix)] for name in os.listdir(history_store.DATA_DIR)
+                  if name.endswith(suffix) and os.path.isdir(os.path.join(history_store.DATA_DIR, name)))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == 'compact':
+        include_current = '--all' in args
+        regions = [a for a in args[1:] if a != '--all'] or find_regions()
+        total = sum(compact(region, include_current) for region in regions)
+        print("[{}] 共合并 {} 个文件".format(get_now_time(), total))
+    elif len(args) == 3 and args[0] == 'show':
+        data = load_run(args[1], args[2])
+        if data is None:
+            print(f"未找到 {args[2]}")
+            sys.exit(1)
+        print(json.dumps(data, ensure_ascii=False, indent=4))
+    else:
+        print("用法: python compact_logs.py compact [地区 ...] [--all] | show <地区> <运行名>")
+        sys.exit(1)
@@ -0,0 +1,126 @@
+# coding:utf-8
+"""
+Bing HPImageArchive 抓取
+
+所有地区共用一个带连接池的 requests.Session（keep-alive），
+并发请求时按主机限速，代替原来每个地区之后固定 sleep 3 秒。
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BING_ARCHIVE_URL = "https://www.bing.com/HPImageArchive.aspx"
+
+WORK_LIST = [
+    "de-DE", "en-CA", "en-GB", "en-IN", "en-US", "fr-FR", "it-IT", "ja-JP", "zh-CN"
+]
+
+env_dist = os.environ
+# 连接池大小，同时也是最大并发数
+POOL_SIZE = int(env_dist.get('CRAWLER_POOL_SIZE', '9'))
+# 同一主机两次请求之间的最小间隔（秒）
+MIN_INTERVAL = float(env_dist.get('CRAWLER_MIN_INTERVAL', '0.1'))
+REQUEST_TIMEOUT = float(env_dist.get('CRAWLER_TIMEOUT', '15'))
+
+
+def get_now_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+
+class HostRateLimiter:
+    """按主机限速：同一主机的请求开始时间至少相隔 min_interval 秒"""
+
+    def __init__(self, min_interval=MIN_INTERVAL):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_session = None
+_session_lock = threading.Lock()
+rate_limiter = HostRateLimiter()
+
+
+def get_session():
+    """获取共享的 Session（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=3)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def fetch_archive(run_type, idx=0, n=8, base_url=BING_ARCHIVE_URL):
+    """请求一个地区的 HPImageArchive 数据"""
+    rate_limiter.wait(urlsplit(base_url).netloc)
+    params = {"format": "js", "idx": idx, "n": n, "mkt": run_type}
+    response = get_session().get(base_url, params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_markets(markets, idx=0, n=8, base_url=BING_ARCHIVE_URL):
+    """
+    并发抓取多个地区
+
+    :return: {地区: 数据}，失败的地区对应的值为异常对象
+    """
+    def _fetch(run_type):
+        try:
+            data = fetch_archive(run_type, idx, n, base_url)
+            print("[{}] ✅ 抓取 {} 成功".format(get_now_time(), run_type))
+            return data
+        except Exception as e:
+            print("[{}] ❌ 抓取 {} 失败: {}".format(get_now_time(), run_type, e))
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(POOL_SIZE, len(markets)))) as executor:
+        return dict(zip(markets, executor.map(_fetch, markets)))
+
+
+def backfill_offsets(max_idx, n=8):
+    """覆盖 idx 0..max_idx 的分页起点，如 max_idx=20、n=8 时为 [0, 8, 16]，最后一页总是从 max_idx 开始"""
+    offsets = list(range(0, max_idx + 1, n))
+    if offsets[-1] != max_idx:
+        offsets.append(max_idx)
+    return offsets
+
+
+def fetch_pages(markets, offsets, n=8, base_url=BING_ARCHIVE_URL):
+    """
+    并发抓取多个地区的多页数据（所有地区、所有页共用一个线程池）
+
+    :return: {地区: [(idx, 数据), ...]}，失败的页对应的值为异常对象
+    """
+    def _fetch(job):
+        run_type, idx = job
+        try:
+            return fetch_archive(run_type, idx, n, base_url)
+        except Exception as e:
+            print("[{}] ❌ 抓取 {} idx={} 失败: {}".format(get_now_time(), run_type, idx, e))
+            return e
+
+    jobs = [(run_type, idx) for run_type in markets for idx in offsets]
+    results = {run_type: [] for run_type in markets}
+    with ThreadPoolExecutor(max_workers=max(1, min(POOL_SIZE, len(jobs)))) as executor:
+        for (run_type, idx), data in zip(jobs, executor.map(_fetch, jobs)):
+            results[run_type].append((idx, data))
+    return results
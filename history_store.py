@@ -0,0 +1,363 @@
+# coding:utf-8
+"""
+追加写入的壁纸历史存储
+
+每个地区一份 data/{region}_history.jsonl（一行一条图片记录，只追加不重写），
+外加一个很小的头文件 data/{region}_history.json 记录条数、最新日期和已提交的字节数，
+以及已有记录的键索引 data/{region}_history.keys（一行 "startdate hsh"），抓取时一次读入用于去重。
+
+每次有新记录追加时都重新导出 {region}_all.json 和 {region}_archive.bin，没有新记录时跳过。
+{region}_all.json 是增量导出的：新记录都比上次导出的更新时，只序列化新记录，拼在旧文件的 data 之前，
+不再读取和解析整个日志；补抓了更早的记录、文件被改动过或 `python ALL.py ... --export` 时全量导出。
+头文件的 Exports 记录每种导出对应的日志大小和最新日期，unexported_images 只读取其后追加的记录。
+
+{region}_all.json 不再是写入目标，而是由 export_all_json 从日志导出的视图。
+日志中的记录带有入库时算好的 uhd、fhd、thumb 地址，导出 {region}_all.json 时去掉，保持原来的格式。
+
+用法:
+    python history_store.py export zh-CN [en-US ...]   # 导出 {region}_all.json
+"""
+import json
+import os
+import sys
+import time
+
+import image_urls
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+HISTORY_VERSION = 1
+# {region}_all.json 中 data 数组的开头，增量导出时新记录插在这之后
+ALL_JSON_DATA_START = '\n    "data": [\n'
+ALL_JSON_DATA_END = '\n    ]\n}'
+
+
+def get_now_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+
+def history_path(run_type):
+    return os.path.join(DATA_DIR, f'{run_type}_history.jsonl')
+
+
+def header_path(run_type):
+    return os.path.join(DATA_DIR, f'{run_type}_history.json')
+
+
+def all_json_path(run_type):
+    return os.path.join(DATA_DIR, f'{run_type}_all.json')
+
+
+def keys_path(run_type):
+    return os.path.join(DATA_DIR, f'{run_type}_history.keys')
+
+
+def _dump_line(item):
+    return (json.dumps(item, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+
+
+def read_header(run_type):
+    """读取头文件，不存在时返回 None"""
+    _path = header_path(run_type)
+    if not os.path.exists(_path):
+        return None
+    with open(_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_header(run_type, header):
+    """原子写入头文件（先写临时文件再替换）"""
+    _path = header_path(run_type)
+    tmp_path = _path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, _path)
+
+
+def _dump_key(item):
+    return "{} {}\n".format(item["startdate"], item.get("hsh", ""))
+
+
+class KnownKeys:
+    """
+    已入库图片的 startdate，O(1) 判断一张图片是否已经存在
+
+    每个地区每天只保留一条记录：doc id、归档的按日期查询和 README 都按 startdate 对应一张图片，
+    同一天重新发布的图片（hsh 不同）不再入库，只用 hsh 提示一下
+    """
+
+    def __init__(self):
+        # startdate -> 先入库的那条记录的 hsh
+        self.dates = {}
+        self.count = 0
+
+    def add(self, startdate, hsh=""):
+        self.dates.setdefault(startdate, hsh)
+        self.count += 1
+
+    def __contains__(self, item):
+        return item["startdate"] in self.dates
+
+    def republished(self, item):
+        """这一天已经有记录，但 hsh 不同（同一天换了图片）"""
+        known = self.dates.get(item["startdate"])
+        hsh = item.get("hsh", "")
+        return bool(known and hsh and known != hsh)
+
+    def __len__(self):
+        return self.count
+
+
+def rebuild_keys(run_type):
+    """从历史日志重建键索引"""
+    _path = keys_path(run_type)
+    tmp_path = _path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for item in iter_images(run_type):
+            f.write(_dump_key(item))
+    os.replace(tmp_path, _path)
+
+
+def load_known_keys(run_type):
+    """
+    读取键索引。索引不存在或行数与头文件的 Total 不一致（上次写入中断）时先从日志重建
+
+    :return: KnownKeys
+    """
+    header = init_store(run_type)
+    keys = KnownKeys()
+    lines = []
+    if os.path.exists(keys_path(run_type)):
+        with open(keys_path(run_type), 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    if len(lines) != header["Total"]:
+        print("[{}] 重建 {}_history.keys".format(get_now_time(), run_type))
+        rebuild_keys(run_type)
+        with open(keys_path(run_type), 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    for line in lines:
+        startdate, _, hsh = line.partition(' ')
+        keys.add(startdate, hsh)
+    return keys
+
+
+def _new_header(run_type):
+    return {
+        "Version": HISTORY_VERSION,
+        "Language": run_type,
+        "LastUpdate": get_now_time(),
+        "Total": 0,
+        "Latest": None,
+        "Size": 0
+    }
+
+
+def init_store(run_type):
+    """
+    确保历史存储存在。首次使用时从现有的 {region}_all.json 迁移（按旧到新的顺序写入）
+
+    :return: 头文件内容
+    """
+    header = read_header(run_type)
+    if header is not None and os.path.exists(history_path(run_type)):
+        return header
+
+    header = _new_header(run_type)
+    images = []
+    if os.path.exists(all_json_path(run_type)):
+        with open(all_json_path(run_type), 'r', encoding='utf-8') as f:
+            all_data = json.load(f)
+        images = [image_urls.with_urls(item) for item in all_data.get("data", [])]
+        header["LastUpdate"] = all_data.get("LastUpdate", header["LastUpdate"])
+        print("[{}] 从 {}_all.json 迁移 {} 条记录".format(get_now_time(), run_type, len(images)))
+
+    with open(history_path(run_type), 'wb') as f:
+        for item in reversed(images):
+            f.write(_dump_line(item))
+        header["Size"] = f.tell()
+    with open(keys_path(run_type), 'w', encoding='utf-8') as f:
+        for item in reversed(images):
+            f.write(_dump_key(item))
+    header["Total"] = len(images)
+    header["Latest"] = images[0]["startdate"] if images else None
+    write_header(run_type, header)
+    return header
+
+
+def append_images(run_type, images):
+    """
+    追加新图片，只写入新增的记录
+
+    :param images: 新图片列表，顺序与 API 返回一致（新 -> 旧）
+    :return: 更新后的头文件内容
+    """
+    header = init_store(run_type)
+    if not images:
+        return header
+
+    with open(history_path(run_type), 'r+b') as f:
+        # 丢弃上次中断时写了一半的内容，以头文件记录的大小为准
+        f.seek(0, os.SEEK_END)
+        if f.tell() != header["Size"]:
+            print("[{}] ⚠️ {}_history.jsonl 大小与头文件不一致，截断到 {} 字节".format(
+                get_now_time(), run_type, header["Size"]))
+            f.truncate(header["Size"])
+            f.seek(header["Size"])
+        for item in reversed(images):
+            f.write(_dump_line(item))
+        header["Size"] = f.tell()
+    # 键索引在头文件之前写入，中断时行数对不上，下次读取会重建
+    with open(keys_path(run_type), 'a', encoding='utf-8') as f:
+        for item in reversed(images):
+            f.write(_dump_key(item))
+
+    header["Total"] += len(images)
+    if header["Latest"] is None or images[0]["startdate"] > header["Latest"]:
+        header["Latest"] = images[0]["startdate"]
+    header["LastUpdate"] = get_now_time()
+    write_header(run_type, header)
+    return header
+
+
+def iter_images(run_type, offset=0):
+    """
+    按写入顺序（旧 -> 新）遍历记录，只读取头文件确认过的部分
+
+    :param offset: 从日志的这个字节位置（某条记录的开头）开始读取
+    """
+    header = init_store(run_type)
+    remaining = header["Size"] - offset
+    with open(history_path(run_type), 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            if remaining < 0:
+                break
+            yield json.loads(line)
+
+
+def load_images(run_type):
+    """返回与 {region}_all.json 中 data 字段一致的列表（新 -> 旧）"""
+    images = list(iter_images(run_type))
+    images.reverse()
+    images.sort(key=lambda item: item["startdate"], reverse=True)
+    return images
+
+
+def mark_exported(run_type, name, header):
+    """
+    在头文件中记录一次导出
+
+    :param name: all_json / archive
+    :param header: 导出时读取的头文件内容，记录其中的日志大小和最新日期
+    """
+    current = init_store(run_type)
+    current.setdefault("Exports", {})[name] = {
+        "Size": header["Size"], "Latest": header["Latest"], "Time": get_now_time()}
+    write_header(run_type, current)
+
+
+def export_due(run_type, name, path):
+    """导出的文件不存在、从未导出，或上次导出之后有新记录时返回 True"""
+    if not os.path.exists(path):
+        return True
+    header = init_store(run_type)
+    export = header.get("Exports", {}).get(name)
+    return export is None or export["Size"] != header["Size"]
+
+
+def unexported_images(run_type, name):
+    """
+    上次导出 name 之后追加到日志的记录，只读取这部分日志
+
+    :return: 记录列表（新 -> 旧）；从未导出时为全部记录
+    """
+    header = init_store(run_type)
+    export = header.get("Exports", {}).get(name)
+    offset = export["Size"] if export and export["Size"] <= header["Size"] else 0
+    images = list(iter_images(run_type, offset))
+    images.reverse()
+    images.sort(key=lambda item: item["startdate"], reverse=True)
+    return images
+
+
+def _public_item(item):
+    """{region}_all.json 中的记录：去掉入库时算好的地址"""
+    return {key: value for key, value in item.items() if key not in image_urls.VARIANTS}
+
+
+def _render_all_json(run_type, header, total, images):
+    return json.dumps({
+        "LastUpdate": header["LastUpdate"],
+        "Total": total,
+        "Language": run_type,
+        "message": "ok",
+        "status": True,
+        "success": True,
+        "info": "https://raw.onmicrosoft.cn/Bing-Wallpaper-Action/main/data/info.json",
+        "data": [_public_item(item) for item in images]
+    }, ensure_ascii=False, indent=4)
+
+
+def _prepend_all_json(run_type, header):
+    """
+    把上次导出之后追加的记录插到现有 {region}_all.json 的 data 开头，旧记录按字节复制，不解析
+
+    :return: 新增的记录数；不能增量导出（从未导出、有更早的记录、文件与记录对不上）时返回 None
+    """
+    export = header.get("Exports", {}).get("all_json")
+    if not export or not export.get("Latest") or export["Size"] > header["Size"]:
+        return None
+    images = unexported_images(run_type, 'all_json')
+    if not images or images[-1]["startdate"] <= export["Latest"]:
+        return None
+    start = ALL_JSON_DATA_START.encode('utf-8')
+    with open(all_json_path(run_type), 'rb') as f:
+        old = f.read()
+    position = old.find(start)
+    if position < 0:
+        return None
+    total = header["Total"]
+    if json.loads(old[:position].decode('utf-8') + '"data": []}')["Total"] != total - len(images):
+        return None
+    head = _render_all_json(run_type, header, total, images)
+    head = head[:-len(ALL_JSON_DATA_END)].encode('utf-8') + b",\n"
+    tmp_path = all_json_path(run_type) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(head)
+        f.write(memoryview(old)[position + len(start):])
+    os.replace(tmp_path, all_json_path(run_type))
+    return len(images)
+
+
+def export_all_json(run_type, full=False):
+    """
+    从历史存储导出 {region}_all.json，格式与原来 main.main 写出的一致
+
+    :param full: 不尝试增量导出
+    :return: 全量导出时为读取的记录列表（新 -> 旧），增量导出时为 None
+    """
+    header = init_store(run_type)
+    added = None if full else _prepend_all_json(run_type, header)
+    if added is not None:
+        mark_exported(run_type, 'all_json', header)
+        print("[{}] 增量导出 {}_all.json 成功，新增 {} 条，共 {} 条".format(
+            get_now_time(), run_type, added, header["Total"]))
+        return None
+    images = load_images(run_type)
+    tmp_path = all_json_path(run_type) + '.tmp'
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        f.write(_render_all_json(run_type, header, len(images), images))
+    os.replace(tmp_path, all_json_path(run_type))
+    mark_exported(run_type, 'all_json', header)
+    print("[{}] 导出 {}_all.json 成功，共 {} 条".format(get_now_time(), run_type, len(images)))
+    return images
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != 'export':
+        print("用法: python history_store.py export <地区> [地区 ...]")
+        sys.exit(1)
+    for region in sys.argv[2:]:
+        export_all_json(region, full=True)
@@ -0,0 +1,26 @@
+# coding:utf-8
+"""
+由 urlbase 推导各尺寸的图片地址
+
+抓取入库时对每条新记录计算一次（with_urls），地址随记录写入历史日志，
+{region}_archive.bin、README 和 Redis 都直接读取记录中的地址，不再各自拼接字符串。
+"""
+BING_HOST = "https://www.bing.com"
+# 缩略图参数（README 表格中使用）
+THUMB_PARAMS = "&pid=hp&w=384&h=216&rs=1&c=4"
+VARIANTS = ("uhd", "fhd", "thumb")
+
+
+def resolve_urls(urlbase):
+    """
+    :param urlbase: 如 /th?id=OHR.FrostySquirrel_ZH-CN4613360783
+    :return: {"uhd": 4K 原图, "fhd": 1920x1080, "thumb": 384x216 缩略图}
+    """
+    prefix = BING_HOST + urlbase
+    uhd = prefix + "_UHD.jpg"
+    return {"uhd": uhd, "fhd": prefix + "_1920x1080.jpg", "thumb": uhd + THUMB_PARAMS}
+
+
+def with_urls(item):
+    """返回带上 uhd、fhd、thumb 地址的记录副本（入库时调用）"""
+    return dict(item, **resolve_urls(item["urlbase"]))
@@ -0,0 +1,189 @@
+# coding:utf-8
+"""
+抓取入库的分阶段耗时统计
+
+INGEST_PROFILE=true 或 `python ALL.py --profile ...` 开启，统计 HTTP 抓取、daily_log 写入、历史存储追加、
+{region}_all.json / {region}_archive.bin 导出、temp.json 读写和 Redis 发布等各阶段的耗时，
+每次运行在 INGEST_PROFILE_OUTPUT（默认 data/ingest_profile.jsonl）追加一行 JSON 报告。
+每日 Actions 默认不开启；手动运行时勾选 profile 开启，报告写到仓库之外并作为 artifact 上传，不随数据提交。
+
+可选：
+    INGEST_PROFILE_CPROFILE=true     报告中附带 cProfile 累计耗时最多的函数，完整数据写入 INGEST_PROFILE_DIR
+    INGEST_PROFILE_TRACEMALLOC=true  报告中附带内存分配峰值和分配最多的代码行
+
+关闭时 stage() 返回共享的空上下文，被统计的代码路径上只多一次属性判断。
+"""
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import tempfile
+import time
+import tracemalloc
+
+import history_store
+
+REPORT_VERSION = 1
+env_dist = os.environ
+# 报告中列出的 cProfile 函数数和 tracemalloc 代码行数
+TOP_N = 15
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def get_now_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+
+def _short_path(filename):
+    return os.path.relpath(filename) if os.path.isabs(filename) else filename
+
+
+def env_flag(name):
+    return env_dist.get(name, 'false').lower() == 'true'
+
+
+class IngestProfiler:
+    """一次运行的统计：各阶段的总耗时和次数，以及按地区的明细"""
+
+    def __init__(self):
+        self.enabled = False
+        self.use_cprofile = False
+        self.use_tracemalloc = False
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.markets = {}
+        self.started = None
+        self.started_at = None
+        self._cprofile = None
+
+    def start(self, use_cprofile=False, use_tracemalloc=False):
+        self.reset()
+        self.enabled = True
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.started_at = get_now_time()
+        if use_tracemalloc:
+            tracemalloc.start()
+        if use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def _stage(self, name, market):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            entry = self.stages.setdefault(name, {"ms": 0.0, "calls": 0})
+            entry["ms"] += ms
+            entry["calls"] += 1
+            if market is not None:
+                detail = self.markets.setdefault(market, {}).setdefault("stages_ms", {})
+                detail[name] = detail.get(name, 0.0) + ms
+
+    def stage(self, name, market=None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._stage(name, market)
+
+    def note(self, market, **values):
+        """记录地区的其他数据（新图片数量、历史条数等）"""
+        if self.enabled:
+            self.markets.setdefault(market, {}).update(values)
+
+    def stop(self, **extra):
+        """
+        结束统计
+
+        :return: 报告 dict
+        """
+        total_ms = (time.perf_counter() - self.started) * 1000
+        report = {
+            "version": REPORT_VERSION,
+            "started_at": self.started_at,
+            "total_ms": round(total_ms, 3),
+            "python": platform.python_version(),
+        }
+        report.update(extra)
+        report["stages"] = {name: {"ms": round(entry["ms"], 3), "calls": entry["calls"]}
+                            for name, entry in self.stages.items()}
+        report["markets"] = {
+            market: dict(detail, stages_ms={k: round(v, 3) for k, v in detail.get("stages_ms", {}).items()})
+            for market, detail in self.markets.items()
+        }
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            report["cprofile"] = self._cprofile_summary()
+        if self.use_tracemalloc:
+            report["tracemalloc"] = self._tracemalloc_summary()
+            tracemalloc.stop()
+        self.enabled = False
+        return report
+
+    def _cprofile_summary(self):
+        stats = pstats.Stats(self._cprofile, stream=io.StringIO())
+        profile_dir = env_dist.get('INGEST_PROFILE_DIR') or tempfile.gettempdir()
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, "ingest_{}.prof".format(time.strftime("%Y-%m-%d_%H-%M-%S")))
+        stats.dump_stats(path)
+        top = []
+        for (filename, line, func), (_, calls, _, cumtime, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_N]:
+            top.append({
+                "function": "{}:{}({})".format(_short_path(filename), line, func),
+                "calls": calls,
+                "cumulative_ms": round(cumtime * 1000, 3),
+            })
+        return {"file": path, "top": top}
+
+    def _tracemalloc_summary(self):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        top = [{"line": "{}:{}".format(_short_path(stat.traceback[0].filename), stat.traceback[0].lineno),
+                "size_kib": round(stat.size / 1024, 1), "count": stat.count}
+               for stat in snapshot.statistics('lineno')[:TOP_N]]
+        return {"peak_kib": round(peak / 1024, 1), "current_kib": round(current / 1024, 1), "top": top}
+
+
+profiler = IngestProfiler()
+
+
+def stage(name, market=None):
+    """统计一个阶段：with ingest_profile.stage('history_append', run_type): ..."""
+    return profiler.stage(name, market)
+
+
+def note(market, **values):
+    profiler.note(market, **values)
+
+
+def is_requested(args=None):
+    """命令行带 --profile 或设置了 INGEST_PROFILE=true"""
+    return env_flag('INGEST_PROFILE') or '--profile' in (args or [])
+
+
+def start():
+    profiler.start(env_flag('INGEST_PROFILE_CPROFILE'), env_flag('INGEST_PROFILE_TRACEMALLOC'))
+
+
+def finish(output=None, **extra):
+    """结束统计，在 output 追加一行报告并打印摘要，返回报告"""
+    report = profiler.stop(**extra)
+    output = output or env_dist.get('INGEST_PROFILE_OUTPUT') or os.path.join(history_store.DATA_DIR, 'ingest_profile.jsonl')
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report, ensure_ascii=False, separators=(',', ':')) + '\n')
+    print("[{}] 分阶段耗时（共 {:.1f} ms，报告已追加到 {}）:".format(get_now_time(), report["total_ms"], output))
+    for name, entry in sorted(report["stages"].items(), key=lambda item: item[1]["ms"], reverse=True):
+        print("    {:<24} {:>10.1f} ms  x{}".format(name, entry["ms"], entry["calls"]))
+    return report
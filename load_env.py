@@ -15,7 +15,7 @@ def debug_env_variables():
     env_vars = [
         'PASSWORD', 'REDIS_HOST', 'REDIS_PORT',
         'PG_HOST', 'PG_PORT', 'PG_DATABASE', 'PG_USER', 'PG_PASSWORD',
-        'PG_TABLE', 'PG_COLUMN', 'REDIS_SET_NAME', 'BATCH_SIZE'
+        'PG_TABLE', 'PG_COLUMN', 'REDIS_SET_NAME', 'BATCH_SIZE', 'MIGRATION_QUEUE_SIZE'
     ]
     
     for var in env_vars:
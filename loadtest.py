@@ -0,0 +1,230 @@
+# coding:utf-8
+"""
+图片 API 本地压测：分别以 BaseHTTPRequestHandler（api/*.py）和 ASGI（asgi.py，需要 uvicorn）
+两种方式启动服务，对相同的路由并发请求，输出 p50 / p99 延迟和每秒请求数
+
+默认在空闲端口启动一个本地 redis-server 作为 Redis 替身，并用 data/ 中的历史数据填充；
+加 --use-env-redis 则直接使用 REDIS_HOST / REDIS_PORT 指向的实例（不会写入数据）
+
+用法:
+    python loadtest.py [--mode sync|asgi|both] [--requests 2000] [--concurrency 16] [--json]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATHS = [
+    "/",
+    "/random",
+    "/api/images?limit=20",
+    "/api/images/latest",
+    "/api/images/today",
+    "/api/images/position/-5",
+    "/api/images/search?q=getty",
+    "/api/images/date?from=20251101&to=20251130",
+]
+
+
+def get_now_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"端口 {port} 未就绪")
+
+
+def start_redis_server(executable):
+    """启动一个不落盘的本地 redis-server，返回 (进程, 端口)"""
+    port = get_free_port()
+    process = subprocess.Popen(
+        [executable, '--port', str(port), '--save', '', '--appendonly', 'no'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_for_port(port)
+    return process, port
+
+
+def seed_redis(port):
+    """用 data/ 中的历史数据填充 bing_images、wallpapers:index 和搜索索引"""
+    import redis
+
+    import image_urls
+    import post_to_redis
+
+    r = redis.Redis(port=port, decode_responses=True)
+    data_dir = os.path.join(ROOT, 'data')
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith('_all.json') and name != 'template_all.json':
+            with open(os.path.join(data_dir, name), 'r', encoding='utf-8') as f:
+                images = [image_urls.with_urls(item) for item in json.load(f)["data"]]
+            post_to_redis.publish_images(r, images)
+            post_to_redis.index_images(r, name[:-len('_all.json')], images)
+    print("[{}] Redis 替身已填充 {} 张图片".format(get_now_time(), r.zcard(post_to_redis.WALLPAPER_INDEX)))
+    r.close()
+
+
+def start_sync_server(port):
+    """以 api/images.py、api/index.py 中的 Handler 启动服务（一次处理一个请求）"""
+    import images
+    import index
+
+    class Router(images.Handler):
+        def do_GET(self):
+            if self.path.startswith('/api/images'):
+                images.Handler.do_GET(self)
+            else:
+                index.handler.do_GET(self)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', port), Router)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def start_asgi_server(port):
+    """以 asgi.py 启动 uvicorn 服务"""
+    import uvicorn
+
+    import asgi
+
+    server = uvicorn.Server(uvicorn.Config(asgi.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return stop
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_load(port, paths, total_requests, concurrency):
+    """并发请求，返回统计结果"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(count, offset):
+        nonlocal errors
+        local_latencies = []
+        local_errors = 0
+        for n in range(count):
+            path = paths[(offset + n) % len(paths)]
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status >= 500:
+                    local_errors += 1
+            except Exception:
+                local_errors += 1
+            local_latencies.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    per_worker = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, count in enumerate(per_worker):
+            executor.submit(worker, count, i)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片 API 本地压测")
+    parser.add_argument('--mode', choices=['sync', 'asgi', 'both'], default='both')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--path', action='append', dest='paths', help="压测的路径，可重复指定")
+    parser.add_argument('--redis-server', default='redis-server', help="redis-server 可执行文件")
+    parser.add_argument('--use-env-redis', action='store_true', help="使用环境变量中的 Redis，不启动替身")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+    redis_process = None
+    if not args.use_env_redis:
+        redis_process, redis_port = start_redis_server(args.redis_server)
+        os.environ.update(REDIS_HOST='127.0.0.1', REDIS_PORT=str(redis_port), REDIS_SSL='false')
+        os.environ.pop('REDIS_PASSWORD', None)
+        seed_redis(redis_port)
+
+    modes = ['sync', 'asgi'] if args.mode == 'both' else [args.mode]
+    starters = {'sync': start_sync_server, 'asgi': start_asgi_server}
+    results = {}
+    try:
+        for mode in modes:
+            port = get_free_port()
+            stop = starters[mode](port)
+            try:
+                wait_for_port(port)
+                # 预热：建立连接池、填充进程内缓存
+                run_load(port, args.paths or DEFAULT_PATHS, len(args.paths or DEFAULT_PATHS), 1)
+                results[mode] = run_load(port, args.paths or DEFAULT_PATHS, args.requests, args.concurrency)
+            finally:
+                stop()
+    finally:
+        if redis_process is not None:
+            redis_process.terminate()
+            redis_process.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("{:<6} {:>9} {:>7} {:>10} {:>9} {:>9}".format("mode", "requests", "errors", "req/s", "p50 ms", "p99 ms"))
+    for mode, result in results.items():
+        print("{:<6} {:>9} {:>7} {:>10} {:>9} {:>9}".format(
+            mode, result["requests"], result["errors"], result["rps"], result["p50_ms"], result["p99_ms"]))
+
+
+if __name__ == "__main__":
+    main()
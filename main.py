@@ -1,74 +1,92 @@
 # coding:utf-8
-import requests
 import json
 import time
 import os
 
+import crawler
+import history_store
+import image_urls
+import ingest_profile
+
 
 def get_now_time():
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
 
 
-def read_update_json(run_type):
-    _path = os.path.join(os.path.dirname(__file__), 'data', f'{run_type}_update.json')
-    with open(_path, "r", encoding="utf-8") as _f_:
-        _data = json.load(_f_)
-    return _data
-
+def store_new_images(run_type, data_list):
+    """
+    去掉已有的图片，把新图片写入 {run_type}_temp.json 和历史存储，
+    新图片在这里算好各尺寸的地址（uhd、fhd、thumb），之后的导出和发布都直接读取
 
-def main(run_type):
-    data = requests.get(f"https://www.bing.com/HPImageArchive.aspx?format=js&idx=0&n=8&mkt={run_type}").json()
-    print("[{}] 开始读取 API".format(get_now_time()))
-    data_list = data["images"]
+    :param data_list: API 返回的图片列表（可以来自多页，已按 startdate 合并）
+    :return: 新图片列表（新 -> 旧），带有各尺寸的地址
+    """
     write_list = []
-    # 写入 data/daily_log/{date}.json
-    path = os.path.join(os.path.dirname(__file__), 'data', f'{run_type}_daily_log',
-                        "{}_{}.json".format(run_type, get_now_time()).replace(" ", "_").replace(":", "-"))
-    with open(path, "w", encoding="utf-8") as _f_:
-        json.dump(data, _f_, ensure_ascii=False, indent=4)
-    print("[{}] 开始读取更新文件".format(get_now_time()))
+    print("[{}] 开始读取已有记录索引".format(get_now_time()))
+    with ingest_profile.stage('known_keys_load', run_type):
+        known_keys = history_store.load_known_keys(run_type)
+    # 检查返回的每一张图片，不在第一张已有图片处停止，窗口重叠或顺序变化时也不会漏掉或重复
     for i in data_list:
-        before_data = read_update_json(run_type)
-        if i["startdate"] not in before_data["images"][0]["startdate"]:
-            print("[{}] 新图片: {}".format(get_now_time(), i["title"]))
-            write_list.append(i)
-        else:
-            break
+        if i in known_keys:
+            if known_keys.republished(i):
+                print("[{}] ⚠️ {} 重新发布了图片（hsh 不同），保留已入库的记录: {}".format(
+                    get_now_time(), i["startdate"], i["title"]))
+            continue
+        print("[{}] 新图片: {}".format(get_now_time(), i["title"]))
+        known_keys.add(i["startdate"], i.get("hsh", ""))
+        write_list.append(image_urls.with_urls(i))
+    write_list.sort(key=lambda item: item["startdate"], reverse=True)
     print("[{}] 开始更新图片".format(get_now_time()))
     print("[{}] 更新图片数量：{}".format(get_now_time(), len(write_list)))
     # 将write_list写入temp.json
-    with open(os.path.join(os.path.dirname(__file__), 'data', f'{run_type}_temp.json'), "w", encoding="utf-8") as _f:
-        json.dump(write_list, _f, ensure_ascii=False, indent=4)
-    # 读取 data/all.json
-    with open(f'data/{run_type}_all.json', 'r', encoding="utf-8") as f:
-        all_data = json.load(f)
-    print("[{}] 开始更新 {}_all.json".format(run_type, get_now_time()))
-    print("[{}] 更新前 {}_all.json 数量：{}".format(get_now_time(), run_type, len(all_data["data"])))
+    with ingest_profile.stage('temp_json_write', run_type):
+        with open(os.path.join(history_store.DATA_DIR, f'{run_type}_temp.json'), "w", encoding="utf-8") as _f:
+            json.dump(write_list, _f, ensure_ascii=False, indent=4)
+    # 只追加新图片到 data/{run_type}_history.jsonl，{run_type}_all.json 由 history_store 导出
+    print("[{}] 开始更新 {}_history.jsonl".format(get_now_time(), run_type))
+    with ingest_profile.stage('history_append', run_type):
+        header = history_store.append_images(run_type, write_list)
+    print("[{}] 更新后 {} 历史记录数量：{}".format(get_now_time(), run_type, header["Total"]))
+    ingest_profile.note(run_type, new_images=len(write_list), history_total=header["Total"])
+    return write_list
 
-    before_all_list = all_data["data"]
-    write_list.extend(before_all_list)
 
-    print("[{}] 更新后 {}_all.json 数量：{}".format(get_now_time(), run_type, len(write_list)))
+def merge_pages(pages):
+    """
+    合并同一地区多页（不同 idx）的响应，按 startdate 去重，页码小（较新）的响应优先
 
-    data_data = {
-        "LastUpdate": get_now_time(),
-        "Total": len(write_list),
-        "Language": run_type,
-        "message": "ok",
-        "status": True,
-        "success": True,
-        "info": "https://raw.onmicrosoft.cn/Bing-Wallpaper-Action/main/data/info.json",
-        "data": write_list
-    }
+    :param pages: [(idx, data), ...]
+    :return: 图片列表（新 -> 旧）
+    """
+    merged = {}
+    for _, data in sorted(pages, key=lambda page: page[0]):
+        for item in data.get("images", []):
+            merged.setdefault(item["startdate"], item)
+    return [merged[date] for date in sorted(merged, reverse=True)]
 
-    # 保存至 data/all.json
-    with open(f'data/{run_type}_all.json', 'w', encoding="utf-8") as f:
-        json.dump(data_data, f, ensure_ascii=False, indent=4)
 
-    print("[{}] 更新 {}_all.json 成功".format(get_now_time(), run_type))
+def main(run_type, data=None):
+    """
+    :param data: 已经抓取好的 HPImageArchive 数据（ALL.py 并发抓取时传入），为空时自行请求
+    """
+    if data is None:
+        with ingest_profile.stage('http_fetch', run_type):
+            data = crawler.fetch_archive(run_type)
+    print("[{}] 开始读取 API".format(get_now_time()))
+    data_list = data["images"]
+    # 写入 data/daily_log/{date}.json
+    path = os.path.join(history_store.DATA_DIR, f'{run_type}_daily_log',
+                        "{}_{}.json".format(run_type, get_now_time()).replace(" ", "_").replace(":", "-"))
+    with ingest_profile.stage('daily_log_write', run_type):
+        with open(path, "w", encoding="utf-8") as _f_:
+            json.dump(data, _f_, ensure_ascii=False, indent=4)
+    write_list = store_new_images(run_type, data_list)
 
     # 保存至 data/update.json
-    with open(f'data/{run_type}_update.json', 'w', encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    with ingest_profile.stage('update_json_write', run_type):
+        with open(os.path.join(history_store.DATA_DIR, f'{run_type}_update.json'), 'w', encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
 
     print("[{}] 更新 {}_update.json 成功".format(get_now_time(), run_type))
+
+    return write_list
@@ -1,50 +1,258 @@
 # coding:utf-8
-import json
+"""
+生成 README.md
+
+README 只保留最近 README_DAYS 天的表格，更早的行按年份移到 archive/{year}.md。
+默认增量更新：从 {region}_archive.bin 只读取最近几天的记录（归档导出之后新增的记录从历史日志末尾补上），替换表格顶部的行，
+挤出表格的行插入对应年份的归档页，耗时和 README 大小都与历史长度无关。
+README 中没有表格标记或地区列表变化时自动全量重建。
+
+用法:
+    python make_readme.py [--full] [--markets zh-CN en-US ...] [--days 30]
+"""
+import os
+import re
+import sys
 import time
+from datetime import datetime, timedelta
+
+import compact_archive
+import history_store
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+README_PATH = os.path.join(ROOT, 'README.md')
+ARCHIVE_DIR = os.path.join(ROOT, 'archive')
+
+DEFAULT_MARKETS = ["zh-CN", "en-US"]
+MARKET_NAMES = {
+    "de-DE": "German – Germany",
+    "en-CA": "English – Canada",
+    "en-GB": "English – United Kingdom",
+    "en-IN": "English – India",
+    "en-US": "English – United States",
+    "fr-FR": "French – France",
+    "it-IT": "Italian – Italy",
+    "ja-JP": "Japanese – Japan",
+    "zh-CN": "Chinese – China",
+}
+# README 表格保留的天数
+README_DAYS = int(os.environ.get('README_DAYS', '30'))
+# 每次重新生成最近几天的行（HPImageArchive 一次返回 8 天，某个地区晚一天更新时补上空缺的格子）
+REFRESH_DAYS = 8
+
+TABLE_BEGIN = re.compile(r'^<!-- BEGIN WALLPAPERS markets=(?P<markets>[\w,-]+) -->$')
+TABLE_END = '<!-- END WALLPAPERS -->'
+ROW_DATE = re.compile(r'!\[(\d{4}-\d{2}-\d{2})\]')
 
 
 def get_now_time():
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
 
 
-#   "zh-CN", "en-US"
-# 读取 data/zh-CN_all.json 文件，生成 README.md 文件
-with open('data/zh-CN_all.json', 'r', encoding='utf-8') as f:
-    zh_data = json.load(f)
-
-with open('data/en-US_all.json', 'r', encoding='utf-8') as f:
-    en_data = json.load(f)
-
-all_day = min(
-    len(zh_data['data']),
-    len(en_data['data'])
-)
-print("[{}] all day: {}".format(get_now_time(), all_day))
-
-head_img = "https://www.bing.com" + zh_data['data'][0]['urlbase'] + "_UHD.jpg"
-head_des = zh_data['data'][0]['copyright']
-head_title = zh_data['data'][0]['title']
-
-f = open('README.md', 'w', encoding='utf-8')
-f.write("# Bing Wallpaper\n")
-f.write(f"<!--{get_now_time()}-->\n")
-f.write("![{0}]({2}) Today: [{0}]({1})\n".format(head_title, head_img, head_img + "&w=1920"))
-f.write("""
-|  Chinese – China   |   English – United States   |
-| :----: | :----: |
-""")
-for i in range(all_day):
-    print("[{}] day: {}".format(get_now_time(), i + 1))
-    zh_day = zh_data['data'][i]
-    en_day = en_data['data'][i]
-    zh_date = zh_day['enddate']
-    zh_date_format = "{}-{}-{}".format(zh_date[0:4], zh_date[4:6], zh_date[6:8])
-    en_date = en_day['enddate']
-    en_date_format = "{}-{}-{}".format(en_date[0:4], en_date[4:6], en_date[6:8])
-    zh_url_full = "https://www.bing.com" + zh_day['urlbase'] + "_UHD.jpg"
-    zh_readme_url = zh_url_full + "&pid=hp&w=384&h=216&rs=1&c=4"
-    en_url_full = "https://www.bing.com" + en_day['urlbase'] + "_UHD.jpg"
-    en_readme_url = en_url_full + "&pid=hp&w=384&h=216&rs=1&c=4"
-    f.write("| ![{0}]({1}) {0} [download 4k]({3})| ![{2}]({4}) {2} [download 4k]({5})|\n".format(zh_date_format, zh_readme_url, en_date_format, zh_url_full, en_readme_url, en_url_full))
-
-f.write("-------------------\n")
\ No newline at end of file
+def format_date(date):
+    return "{}-{}-{}".format(date[0:4], date[4:6], date[6:8])
+
+
+def end_date(startdate):
+    """表格按 enddate 显示，归档中只有 startdate（enddate 总是后一天）"""
+    return (datetime.strptime(startdate, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+
+
+def table_header(markets):
+    names = [MARKET_NAMES.get(market, market) for market in markets]
+    return "|  " + "   |   ".join(names) + "   |\n" + "| :----: " * len(markets) + "|\n"
+
+
+def render_cell(item):
+    if item is None:
+        return " "
+    # 地址在入库时已由 image_urls 算好
+    return " ![{0}]({1}) {0} [download 4k]({2})".format(format_date(item["enddate"]), item["thumb"], item["uhd"])
+
+
+def render_row(markets, day):
+    """:param day: {地区: 记录}"""
+    return "|" + "|".join(render_cell(day.get(market)) for market in markets) + "|\n"
+
+
+def row_date(line):
+    match = ROW_DATE.search(line)
+    return match.group(1).replace('-', '') if match else None
+
+
+def history_item(item):
+    """历史日志中的记录转换为与归档记录相同的字段"""
+    return {name: item.get(name) or "" for name in compact_archive.COLUMNS}
+
+
+def read_days(markets, since=None):
+    """
+    从各地区的二进制归档按日期读取记录（新 -> 旧），since 之前的不读取。
+    归档不是每天导出，导出之后追加的记录从历史日志末尾读取，同一天以日志中的为准
+
+    :return: {enddate: {地区: 记录}}，以及第一个有记录的地区最新的一条记录（都没有时为 None）
+    """
+    days = {}
+    latest = None
+    for market in markets:
+        with compact_archive.CompactArchive.open_or_export(market) as archive:
+            newest = None
+            for item in history_store.unexported_images(market, 'archive'):
+                if since is not None and end_date(item["startdate"]) < since:
+                    break
+                item = history_item(item)
+                item["enddate"] = end_date(item["startdate"])
+                days.setdefault(item["enddate"], {})[market] = item
+                if newest is None or item["startdate"] > newest["startdate"]:
+                    newest = item
+            for index in range(len(archive)):
+                startdate = archive.startdate(index)
+                if since is not None and end_date(startdate) < since:
+                    break
+                enddate = end_date(startdate)
+                if market in days.get(enddate, {}):
+                    continue
+                item = archive[index]
+                item["enddate"] = enddate
+                days.setdefault(enddate, {})[market] = item
+                if newest is None or item["startdate"] > newest["startdate"]:
+                    newest = item
+            if latest is None:
+                latest = newest
+    return days, latest
+
+
+def render_header(latest):
+    """:param latest: 最新的一条记录（第一个有记录的地区），所有地区都没有记录时为 None"""
+    header = "# Bing Wallpaper\n" + "<!--{}-->\n".format(get_now_time())
+    if latest is None:
+        return header
+    return header + "![{0}]({1}&w=1920) Today: [{0}]({1})\n".format(latest['title'], latest['uhd'])
+
+
+def render_readme(markets, latest, rows, years):
+    links = " | ".join("[{0}](archive/{0}.md)".format(year) for year in years)
+    return (render_header(latest)
+            + "\n<!-- BEGIN WALLPAPERS markets={} -->\n".format(",".join(markets))
+            + table_header(markets)
+            + "".join(line for _, line in rows)
+            + TABLE_END + "\n"
+            + ("\nArchive: {}\n".format(links) if links else "")
+            + "-------------------\n")
+
+
+def parse_readme(markets):
+    """读取 README 中的表格行，格式或地区不符时返回 None"""
+    if not os.path.exists(README_PATH):
+        return None
+    with open(README_PATH, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    begin = next((i for i, line in enumerate(lines) if TABLE_BEGIN.match(line.strip())), None)
+    if begin is None or TABLE_BEGIN.match(lines[begin].strip()).group('markets') != ",".join(markets):
+        return None
+    rows = []
+    for line in lines[begin + 3:]:  # 跳过标记和表头两行
+        if line.strip() == TABLE_END:
+            return rows
+        rows.append((row_date(line), line))
+    return None
+
+
+def page_path(year):
+    return os.path.join(ARCHIVE_DIR, f'{year}.md')
+
+
+def read_page(year):
+    if not os.path.exists(page_path(year)):
+        return []
+    with open(page_path(year), 'r', encoding='utf-8') as f:
+        # 表头两行中没有日期
+        return [(row_date(line), line) for line in f if line.startswith('|') and row_date(line)]
+
+
+def write_page(markets, year, rows):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with open(page_path(year), 'w', encoding='utf-8') as f:
+        f.write("# Bing Wallpaper {}\n\n[Back to README](../README.md)\n\n".format(year))
+        f.write(table_header(markets))
+        f.writelines(line for _, line in rows)
+
+
+def merge_into_pages(markets, rows):
+    """把挤出 README 的行并入对应年份的归档页（同一日期的行以新的为准）"""
+    by_year = {}
+    for date, line in rows:
+        by_year.setdefault(date[:4], []).append((date, line))
+    for year, new_rows in by_year.items():
+        dates = {date for date, _ in new_rows}
+        merged = new_rows + [row for row in read_page(year) if row[0] not in dates]
+        merged.sort(key=lambda row: row[0], reverse=True)
+        write_page(markets, year, merged)
+
+
+def list_years():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted((name[:-3] for name in os.listdir(ARCHIVE_DIR) if re.match(r'^\d{4}\.md$', name)), reverse=True)
+
+
+def write_readme(content):
+    with open(README_PATH, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def build_full(markets, days_kept):
+    """全量生成 README 和所有年份的归档页"""
+    days, latest = read_days(markets)
+    rows = [(date, render_row(markets, days[date])) for date in sorted(days, reverse=True)]
+    by_year = {}
+    for row in rows[days_kept:]:
+        by_year.setdefault(row[0][:4], []).append(row)
+    for year, year_rows in by_year.items():
+        write_page(markets, year, year_rows)
+    write_readme(render_readme(markets, latest, rows[:days_kept], list_years()))
+    print("[{}] 全量生成 README.md：{} 天，归档 {} 个年份".format(get_now_time(), len(rows), len(by_year)))
+
+
+def build_incremental(markets, days_kept, existing_rows):
+    """只重新生成最近几天的行，其余的行沿用 README 中已有的内容"""
+    latest_date = max((date for date, _ in existing_rows if date), default=None)
+    since = None
+    if latest_date is not None:
+        since = (datetime.strptime(latest_date, '%Y%m%d') - timedelta(days=REFRESH_DAYS)).strftime('%Y%m%d')
+    days, latest = read_days(markets, since)
+    fresh = [(date, render_row(markets, days[date])) for date in sorted(days, reverse=True)]
+    kept = [row for row in existing_rows if row[0] and (since is None or row[0] < since)]
+    rows = fresh + kept
+    overflow = rows[days_kept:]
+    if overflow:
+        merge_into_pages(markets, overflow)
+    write_readme(render_readme(markets, latest, rows[:days_kept], list_years()))
+    new_days = sum(1 for date in days if latest_date is None or date > latest_date)
+    print("[{}] 增量更新 README.md：新增 {} 天，移入归档 {} 行".format(get_now_time(), new_days, len(overflow)))
+
+
+def main(markets=None, days_kept=None, full=False):
+    markets = markets or DEFAULT_MARKETS
+    days_kept = max(days_kept or README_DAYS, REFRESH_DAYS)
+    existing_rows = None if full else parse_readme(markets)
+    if existing_rows is None:
+        build_full(markets, days_kept)
+    else:
+        build_incremental(markets, days_kept, existing_rows)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    full_arg = '--full' in args
+    days_arg = None
+    markets_arg = None
+    if '--days' in args:
+        days_arg = int(args[args.index('--days') + 1])
+    if '--markets' in args:
+        markets_arg = []
+        for arg in args[args.index('--markets') + 1:]:
+            if arg.startswith('--'):
+                break
+            markets_arg.append(arg)
+    main(markets_arg, days_arg, full_arg)
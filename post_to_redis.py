@@ -4,11 +4,23 @@ import redis
 import json
 import time
 import os
+import sys
+from datetime import datetime, timedelta
+
+import history_store
+import ingest_profile
+# 索引的键名和分词规则与 api/ 下的接口共用
+import wallpaper_index
+from wallpaper_index import DATA_VERSION_KEY, WALLPAPER_INDEX
 
 env_dist = os.environ
 PASSWORD = env_dist.get('PASSWORD')
 REDIS_HOST = env_dist.get('REDIS_HOST')
 REDIS_PORT = env_dist.get('REDIS_PORT')
+# pipeline 每批写入的图片数量
+BATCH_SIZE = int(env_dist.get('REDIS_BATCH_SIZE', '500'))
+# 提前选好今后几天（含今天）的每日壁纸，避免 API 在零点后首个请求时才选取
+TODAY_PRECOMPUTE_DAYS = int(env_dist.get('TODAY_PRECOMPUTE_DAYS', '3'))
 
 def get_redis_connection():
     """获取Redis连接，包含错误处理"""
@@ -48,40 +60,190 @@ def get_redis_connection():
 def get_now_time():
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
 
-def main(run_type):
+def publish_images(r, images, batch_size=None):
+    """
+    通过 pipeline 分批写入 bing_images 和 wallpapers:index，每批只有一次往返
+
+    :param images: 图片记录列表（需要 url、startdate、title 字段和入库时算好的 uhd）
+    :param batch_size: 每批的图片数量，默认取 REDIS_BATCH_SIZE
+    :return: (新增数量, 已存在数量, 失败数量)
+    """
+    batch_size = batch_size or BATCH_SIZE
+    added_count = 0
+    existing_count = 0
+    error_count = 0
+
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        pipe = r.pipeline(transaction=False)
+        for i in chunk:
+            pipe.sadd("bing_images", i["url"])
+            pipe.zadd(WALLPAPER_INDEX, {i["uhd"]: int(i["startdate"])})
+        try:
+            # raise_on_error=False: 单条命令失败时在结果中返回异常，不影响同批其他图片
+            replies = pipe.execute(raise_on_error=False)
+        except Exception as e:
+            print(f"[{get_now_time()}] ❌ 第 {start // batch_size + 1} 批写入失败 ({len(chunk)} 张): {e}")
+            error_count += len(chunk)
+            continue
+
+        # 每张图片对应两条命令：SADD、ZADD
+        for i, reply, index_reply in zip(chunk, replies[0::2], replies[1::2]):
+            error = next((x for x in (reply, index_reply) if isinstance(x, Exception)), None)
+            if error is not None:
+                print(f"[{get_now_time()}] ❌ 添加失败 {i['title']}: {error}")
+                error_count += 1
+            elif reply == 1:
+                added_count += 1
+            else:
+                existing_count += 1
+
+    if added_count:
+        r.incr(DATA_VERSION_KEY)
+
+    return added_count, existing_count, error_count
+
+
+def index_images(r, run_type, images, batch_size=None):
+    """
+    写入图片的元数据（wallpapers:meta）、日期索引（wallpapers:dates、wallpapers:dates:{地区}）
+    和标题、版权信息的倒排索引（search:t:{词}），每批内同一个词的所有图片合并为一条多成员 ZADD
+
+    同一批的图片共用合并后的命令，任何一条失败时整批计为失败，不影响其他批次；索引写入是幂等的，再次运行会补上
+
+    :return: (新写入元数据的图片数量, 写入失败的图片数量)
+    """
+    batch_size = batch_size or BATCH_SIZE
+    added_count = 0
+    error_count = 0
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        postings = {}
+        meta = {}
+        dates = {}
+        for i in chunk:
+            _id = wallpaper_index.doc_id(run_type, i["startdate"])
+            meta[_id] = wallpaper_index.image_meta(run_type, i, i["uhd"])
+            dates[_id] = int(i["startdate"])
+            for token in wallpaper_index.image_tokens(i):
+                postings.setdefault(token, {})[_id] = int(i["startdate"])
+        pipe = r.pipeline(transaction=False)
+        pipe.hset(wallpaper_index.IMAGE_META, mapping=meta)
+        pipe.zadd(wallpaper_index.date_index_key(), dates)
+        pipe.zadd(wallpaper_index.date_index_key(run_type), dates)
+        for token, members in postings.items():
+            pipe.zadd(wallpaper_index.SEARCH_TOKEN_PREFIX + token, members)
+        batch_number = start // batch_size + 1
+        try:
+            # raise_on_error=False: 单条命令失败时在结果中返回异常，其余命令照常执行
+            replies = pipe.execute(raise_on_error=False)
+        except Exception as e:
+            print(f"[{get_now_time()}] ❌ 第 {batch_number} 批索引写入失败 ({len(chunk)} 张): {e}")
+            error_count += len(chunk)
+            continue
+        error = next((reply for reply in replies if isinstance(reply, Exception)), None)
+        if error is not None:
+            print(f"[{get_now_time()}] ❌ 第 {batch_number} 批索引写入失败 ({len(chunk)} 张): {error}")
+            error_count += len(chunk)
+        if not isinstance(replies[0], Exception):
+            added_count += replies[0]
+    if added_count:
+        r.incr(DATA_VERSION_KEY)
+    return added_count, error_count
+
+
+def schedule_today_wallpapers(r, days=None):
+    """
+    从 wallpapers:index 为今天起的 days 天各选一张每日壁纸（wallpaper:today:{date}），
+    使用 SET NX，已经选好的日期（包括 API 已经选过的今天）不会被覆盖
+
+    :return: 新选定的天数
+    """
+    days = TODAY_PRECOMPUTE_DAYS if days is None else days
+    if days <= 0:
+        return 0
+    # 与 API 的今日壁纸脚本使用同一个数据源
+    candidates = r.zrandmember(WALLPAPER_INDEX, days)
+    if not candidates:
+        print("[{}] ⚠️ {} 为空，没有预选每日壁纸".format(get_now_time(), WALLPAPER_INDEX))
+        return 0
+
+    pipe = r.pipeline(transaction=False)
+    today = datetime.now()
+    for offset in range(days):
+        day = today + timedelta(days=offset)
+        # 保留到当天结束之后
+        ttl = 86400 * (offset + 1) + 3600
+        pipe.set(f"wallpaper:today:{day.strftime('%Y-%m-%d')}", candidates[offset % len(candidates)], ex=ttl, nx=True)
+    scheduled = sum(1 for reply in pipe.execute() if reply)
+    print("[{}] 预选每日壁纸: 新增 {} 天".format(get_now_time(), scheduled))
+    return scheduled
+
+
+def main(run_type, r=None):
+    """
+    :param r: 复用的 Redis 连接（ALL.py 处理多个地区时传入），为空时自行创建并在结束后关闭
+    """
     # 读取 data/temo.json
-    with open(f'data/{run_type}_temp.json', 'r', encoding="utf-8") as f:
-        data = json.load(f)
+    with ingest_profile.stage('temp_json_read', run_type):
+        with open(os.path.join(history_store.DATA_DIR, f'{run_type}_temp.json'), 'r', encoding="utf-8") as f:
+            data = json.load(f)
     print("[{}] 开始更新 redis".format(get_now_time()))
 
     try:
         # 获取Redis连接
-        r = get_redis_connection()
-        
-        success_count = 0
-        error_count = 0
-        
-        for i in data:
-            try:
-                print("[{}] 更新图片：{}".format(get_now_time(), i["title"]))
-                result = r.sadd("bing_images", i["url"])
-                
-                if result == 1:
-                    print(f"[{get_now_time()}] ✅ 成功添加: {i['title']}")
-                    success_count += 1
-                else:
-                    print(f"[{get_now_time()}] ℹ️ 图片已存在: {i['title']}")
-                    
-            except Exception as e:
-                print(f"[{get_now_time()}] ❌ 添加失败 {i['title']}: {e}")
-                error_count += 1
-                continue  # 继续处理下一张图片
+        own_connection = r is None
+        if own_connection:
+            r = get_redis_connection()
+
+        with ingest_profile.stage('redis_publish', run_type):
+            added_count, existing_count, error_count = publish_images(r, data)
+        print("[{}] 更新完成: 成功 {} 张, 已存在 {} 张, 失败 {} 张".format(
+            get_now_time(), added_count, existing_count, error_count))
+        with ingest_profile.stage('redis_index', run_type):
+            indexed_count, index_error_count = index_images(r, run_type, data)
+        print("[{}] 日期和搜索索引新增 {} 张, 失败 {} 张".format(get_now_time(), indexed_count, index_error_count))
+
+        with ingest_profile.stage('redis_schedule', run_type):
+            schedule_today_wallpapers(r)
 
-        print("[{}] 更新完成: 成功 {} 张, 失败 {} 张".format(get_now_time(), success_count, error_count))
-        
         # 关闭连接
-        r.close()
-        
+        if own_connection:
+            r.close()
+
     except Exception as e:
         print(f"[{get_now_time()}] ❌ Redis操作失败: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def backfill(run_type, r, batch_size=None):
+    """把一个地区的完整历史写入 Redis"""
+    images = history_store.load_images(run_type)
+    print("[{}] 开始回填 {}：共 {} 张".format(get_now_time(), run_type, len(images)))
+    added_count, existing_count, error_count = publish_images(r, images, batch_size)
+    print("[{}] 回填 {} 完成: 成功 {} 张, 已存在 {} 张, 失败 {} 张".format(
+        get_now_time(), run_type, added_count, existing_count, error_count))
+    indexed_count, index_error_count = index_images(r, run_type, images, batch_size)
+    print("[{}] 日期和搜索索引新增 {} 张, 失败 {} 张".format(get_now_time(), indexed_count, index_error_count))
+    return error_count + index_error_count
+
+
+if __name__ == "__main__":
+    # 用法: python post_to_redis.py backfill <地区> [地区 ...] [--batch-size N]
+    args = sys.argv[1:]
+    batch_size_arg = None
+    if '--batch-size' in args:
+        pos = args.index('--batch-size')
+        batch_size_arg = int(args[pos + 1])
+        del args[pos:pos + 2]
+    if len(args) < 2 or args[0] != 'backfill':
+        print("用法: python post_to_redis.py backfill <地区> [地区 ...] [--batch-size N]")
+        sys.exit(1)
+
+    redis_conn = get_redis_connection()
+    try:
+        total_errors = sum(backfill(region, redis_conn, batch_size_arg) for region in args[1:])
+    finally:
+        redis_conn.close()
+    if total_errors:
+        sys.exit(1)
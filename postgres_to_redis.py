@@ -1,6 +1,20 @@
 # coding: utf-8
+"""
+把 PostgreSQL 表中的一列迁移到 Redis 集合
+
+使用命名（服务端）游标按 BATCH_SIZE 分批读取，内存占用与表大小无关；
+每批用一条多成员 SADD 写入，写入在后台线程进行，与读取下一批重叠。
+每批写入时在同一个事务中记录检查点（已写入的最大值，PostgreSQL 的文本表示），中断后再次运行从检查点继续。
+
+用法:
+    python postgres_to_redis.py [--restart]   # --restart 忽略检查点，从头迁移
+"""
 import os
+import queue
+import sys
+import threading
 import psycopg2
+from psycopg2 import sql
 import redis
 from datetime import datetime
 import load_env
@@ -31,7 +45,9 @@ class PostgreSQLToRedisMigrator:
                 'table': os.getenv('PG_TABLE', 'bing'),
                 'column': os.getenv('PG_COLUMN', 'image'),
                 'redis_set': os.getenv('REDIS_SET_NAME', 'bing_images'),
-                'batch_size': int(os.getenv('BATCH_SIZE', '100'))
+                'batch_size': int(os.getenv('BATCH_SIZE', '1000')),
+                # 读取和写入之间最多缓冲的批数
+                'queue_size': int(os.getenv('MIGRATION_QUEUE_SIZE', '2'))
             }
         }
     
@@ -60,62 +76,119 @@ class PostgreSQLToRedisMigrator:
         except Exception as e:
             raise Exception(f"PostgreSQL连接失败: {e}")
     
-    def migrate_data(self):
-        """执行数据迁移"""
+    def checkpoint_key(self):
+        return f"{self.config['migration']['redis_set']}:migration_checkpoint"
+
+    def column_type(self, pg_conn):
+        """迁移列在 PostgreSQL 中的类型（如 text、timestamp without time zone），检查点按这个类型比较"""
+        with pg_conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = %s::regclass AND attname = %s AND NOT attisdropped",
+                (sql.Identifier(self.config['migration']['table']).as_string(pg_conn),
+                 self.config['migration']['column']))
+            row = cursor.fetchone()
+        if row is None:
+            raise Exception(f"找不到列 {self.config['migration']['table']}.{self.config['migration']['column']}")
+        return row[0]
+
+    def select_sql(self, checkpoint, column_type):
+        """
+        按列的原始值排序读取（列上有索引时可以直接按索引顺序读取，不需要排序整张表），
+        检查点之前的行不再读取。每行同时取出 PostgreSQL 自己的文本表示，作为检查点保存，
+        继续时再 CAST 回列的类型比较，时间戳、数值等类型也能精确对应
+        """
+        column = sql.Identifier(self.config['migration']['column'])
+        table = sql.Identifier(self.config['migration']['table'])
+        where = sql.SQL("")
+        if checkpoint is not None:
+            where = sql.SQL(" AND {} > CAST(%s AS {})").format(column, sql.SQL(column_type))
+        return sql.SQL("SELECT {0}, {0}::text FROM {1} WHERE {0} IS NOT NULL{2} ORDER BY {0}").format(
+            column, table, where)
+
+    def flush_worker(self, r, batches, state):
+        """后台写入线程：每批一条 SADD，与检查点在同一个 MULTI/EXEC 中提交"""
+        redis_set = self.config['migration']['redis_set']
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            if state['error'] is not None:
+                continue  # 已经出错，只消费队列让读取线程退出
+            batch, checkpoint = item
+            try:
+                pipeline = r.pipeline(transaction=True)
+                pipeline.sadd(redis_set, *batch)
+                pipeline.set(self.checkpoint_key(), checkpoint)
+                added, _ = pipeline.execute()
+                state['written'] += len(batch)
+                state['added'] += added
+                print(f"[{self.get_now_time()}] 已写入 {state['written']} 条记录（新增 {state['added']}）")
+            except Exception as e:
+                state['error'] = e
+
+    def migrate_data(self, restart=False):
+        """
+        执行数据迁移
+
+        :param restart: 忽略 Redis 中的检查点，从头迁移
+        """
         print(f"[{self.get_now_time()}] 开始数据迁移")
-        
-        # 连接数据库
-        pg_conn = psycopg2.connect(**self.config['postgresql'])
-        pg_cursor = pg_conn.cursor()
-        
-        r = redis.Redis(**self.config['redis'], decode_responses=True)
-        
+        batch_size = self.config['migration']['batch_size']
+
+        r = None
+        pg_conn = None
         try:
-            # 获取数据
-            sql = f"SELECT {self.config['migration']['column']} FROM {self.config['migration']['table']}"
-            pg_cursor.execute(sql)
-            results = pg_cursor.fetchall()
-            
-            total_count = len(results)
-            print(f"[{self.get_now_time()}] 从PostgreSQL获取到 {total_count} 条记录")
-            
-            # 使用pipeline批量导入
-            pipeline = r.pipeline()
-            success_count = 0
-            batch_size = self.config['migration']['batch_size']
-            
-            for i, record in enumerate(results, 1):
-                try:
-                    value = str(record[0])  # 确保转换为字符串
-                    pipeline.sadd(self.config['migration']['redis_set'], value)
-                    success_count += 1
-                    
-                    # 批量执行
-                    if i % batch_size == 0:
-                        pipeline.execute()
-                        print(f"[{self.get_now_time()}] 已处理 {i}/{total_count} 条记录")
-                        
-                except Exception as e:
-                    print(f"[{self.get_now_time()}] 跳过记录 {i}: {e}")
-                    continue
-            
-            # 执行剩余的批次
-            pipeline.execute()
-            
+            r = redis.Redis(**self.config['redis'], decode_responses=True)
+            if restart:
+                r.delete(self.checkpoint_key())
+            checkpoint = r.get(self.checkpoint_key())
+            if checkpoint is not None:
+                print(f"[{self.get_now_time()}] 从检查点 {checkpoint} 之后继续")
+
+            pg_conn = psycopg2.connect(**self.config['postgresql'])
+            query = self.select_sql(checkpoint, self.column_type(pg_conn))
+            # 命名游标在服务端保存结果集，fetchmany 每次只取一批
+            pg_cursor = pg_conn.cursor(name='bing_migration')
+            pg_cursor.itersize = batch_size
+
+            batches = queue.Queue(maxsize=self.config['migration']['queue_size'])
+            state = {'written': 0, 'added': 0, 'error': None}
+            writer = threading.Thread(target=self.flush_worker, args=(r, batches, state), daemon=True)
+            writer.start()
+
+            read_count = 0
+            try:
+                pg_cursor.execute(query, (checkpoint,) if checkpoint is not None else None)
+                while state['error'] is None:
+                    rows = pg_cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    read_count += len(rows)
+                    # 队列满时阻塞，读取最多领先写入 queue_size 批；检查点是最后一行的 PostgreSQL 文本表示
+                    batches.put(([str(row[0]) for row in rows], rows[-1][1]))
+            finally:
+                batches.put(None)
+                writer.join()
+                pg_cursor.close()
+
+            if state['error'] is not None:
+                raise Exception(f"写入 Redis 失败，已写入 {state['written']} 条，再次运行将从检查点继续: {state['error']}")
+
             # 验证结果
             redis_count = r.scard(self.config['migration']['redis_set'])
             print(f"[{self.get_now_time()}] 迁移完成!")
-            print(f"[{self.get_now_time()}] PostgreSQL记录数: {total_count}")
+            print(f"[{self.get_now_time()}] 本次读取PostgreSQL记录数: {read_count}")
             print(f"[{self.get_now_time()}] Redis集合成员数: {redis_count}")
-            print(f"[{self.get_now_time()}] 成功导入: {success_count}")
-            
+            print(f"[{self.get_now_time()}] 新增成员: {state['added']}")
+            r.delete(self.checkpoint_key())
         finally:
-            # 清理资源
-            pg_cursor.close()
-            pg_conn.close()
-            r.close()
+            if pg_conn is not None:
+                pg_conn.close()
+            if r is not None:
+                r.close()
 
-def main():
+def main(restart=False):
     migrator = PostgreSQLToRedisMigrator()
     
     try:
@@ -123,10 +196,10 @@ def main():
         migrator.test_connections()
         
         # 执行迁移
-        migrator.migrate_data()
+        migrator.migrate_data(restart)
         
     except Exception as e:
         print(f"[{migrator.get_now_time()}] 错误: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main('--restart' in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,101 @@
+# tests/conftest.py
+# 测试共用的 fixture：本地 redis-server（没有时跳过用到它的测试）、指向临时目录的 data/、调用 API 路由
+import asyncio
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# api/ 中的模块以下划线开头，放在最后，不会遮住根目录的模块
+sys.path.append(os.path.join(ROOT, 'api'))
+
+import history_store  # noqa: E402
+import image_urls  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """把 history_store.DATA_DIR 指向空的临时目录"""
+    path = tmp_path / 'data'
+    path.mkdir()
+    monkeypatch.setattr(history_store, 'DATA_DIR', str(path))
+    return path
+
+
+@pytest.fixture(scope='session')
+def redis_server():
+    """启动一个不落盘的 redis-server，返回端口"""
+    executable = shutil.which('redis-server')
+    if executable is None:
+        pytest.skip("没有 redis-server")
+    import loadtest
+    process, port = loadtest.start_redis_server(executable)
+    yield port
+    process.terminate()
+    process.wait()
+
+
+@pytest.fixture
+def r(redis_server):
+    """同步客户端，每个测试开始时清空数据"""
+    import redis
+    client = redis.Redis(port=redis_server, decode_responses=True)
+    client.flushdb()
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def call_images(redis_server):
+    """
+    以 api/_app.py 的路由处理一次 /api/images* 请求
+
+    :return: 函数 (path, headers=None) -> (状态码, 解析后的 JSON 或 None, 响应头 dict)
+    """
+    import redis.asyncio
+
+    import _app
+    import _cache
+
+    def call(path, headers=None):
+        # 每次请求前清空进程内缓存，读到的总是 Redis 中的最新数据
+        _cache.response_cache.clear()
+        _cache._version_checked_at = None
+
+        async def run():
+            client = redis.asyncio.Redis(port=redis_server, decode_responses=True)
+            try:
+                return await _app.ImagesRequest(client, headers or {}).route(path)
+            finally:
+                await client.close()
+
+        response = asyncio.run(run())
+        headers = dict(response.headers)
+        body = json.loads(response.body) if headers.get('Content-type') == 'application/json' else None
+        return response.status, body, headers
+
+    return call
+
+
+def make_image(startdate, name, market="zh-CN", title=None, copyright=None, hsh=None):
+    """构造一条 HPImageArchive 图片记录"""
+    suffix = market.upper()
+    return {
+        "startdate": startdate,
+        "fullstartdate": startdate + "1600",
+        "enddate": startdate,
+        "url": "/th?id=OHR.{}_{}1234_1920x1080.jpg&rf=LaDigue_1920x1080.jpg&pid=hp".format(name, suffix),
+        "urlbase": "/th?id=OHR.{}_{}1234".format(name, suffix),
+        "copyright": copyright if copyright is not None else "{} (© Photographer)".format(name),
+        "title": title if title is not None else name,
+        "hsh": hsh if hsh is not None else "hsh-{}-{}".format(name, startdate),
+    }
+
+
+def stored_image(*args, **kwargs):
+    """构造一条入库后的记录：make_image 的字段加上入库时算好的地址"""
+    return image_urls.with_urls(make_image(*args, **kwargs))
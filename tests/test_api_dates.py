@@ -0,0 +1,53 @@
+# tests/test_api_dates.py
+# /api/images/date：单日和日期范围，按地区或所有地区，从 wallpapers:dates 索引读取
+import post_to_redis
+from conftest import stored_image
+
+ZH = [stored_image(date, name) for date, name in (("20251103", "Zebra"), ("20251102", "Apple"), ("20251101", "Mango"))]
+EN = [stored_image(date, name, market="en-US") for date, name in (("20251103", "Zebra"), ("20251030", "Otter"))]
+
+
+def seed(r):
+    post_to_redis.index_images(r, "zh-CN", ZH)
+    post_to_redis.index_images(r, "en-US", EN)
+
+
+def ids(body):
+    return [image["id"] for image in body["images"]]
+
+
+def test_single_day(r, call_images):
+    seed(r)
+    status, body, _ = call_images('/api/images/date/2025-11-03?mkt=zh-CN')
+    assert status == 200
+    assert ids(body) == ["zh-CN:20251103"]
+    assert body["images"][0]["url"] == ZH[0]["uhd"]
+    _, body, _ = call_images('/api/images/date/20251103')
+    assert sorted(ids(body)) == ["en-US:20251103", "zh-CN:20251103"]
+    status, _, headers = call_images('/api/images/date/20251102?mkt=zh-CN&format=image')
+    assert status == 308 and headers['Location'] == ZH[1]["uhd"]
+    assert call_images('/api/images/date/20251104')[0] == 404
+
+
+def test_range_per_market(r, call_images):
+    seed(r)
+    _, body, _ = call_images('/api/images/date?mkt=zh-CN&from=20251101&to=20251102')
+    assert ids(body) == ["zh-CN:20251101", "zh-CN:20251102"]
+    assert body["total"] == 2
+    _, body, _ = call_images('/api/images/date?mkt=zh-CN&from=20251101&sort=reverse&limit=2')
+    assert ids(body) == ["zh-CN:20251103", "zh-CN:20251102"]
+    assert body["total"] == 3 and body["next_offset"] == 2
+    _, body, _ = call_images('/api/images/date?to=20251101')
+    assert ids(body) == ["en-US:20251030", "zh-CN:20251101"]
+    # 范围内没有图片时返回空列表而不是 404
+    status, body, _ = call_images('/api/images/date?mkt=en-US&from=20251101&to=20251102')
+    assert status == 200 and body["total"] == 0 and body["images"] == []
+
+
+def test_invalid_dates(r, call_images):
+    seed(r)
+    for path in ('/api/images/date/20251332', '/api/images/date/2025110',
+                 '/api/images/date?from=yesterday', '/api/images/date?from=20251103&to=20251101'):
+        status, body, _ = call_images(path)
+        assert status == 400, path
+        assert body["status"] == "error"
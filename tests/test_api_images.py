@@ -0,0 +1,155 @@
+# tests/test_api_images.py
+# /api/images、/latest、/position 和随机跳转都从 wallpapers:index 读取同一批图片，索引为空时退回旧的 wallpapers 集合
+import asyncio
+
+import post_to_redis
+from conftest import stored_image
+
+IMAGES = [
+    stored_image("20251103", "Zebra"),
+    stored_image("20251102", "Apple"),
+    stored_image("20251101", "Mango"),
+]
+# 按日期从旧到新
+BY_DATE = [i["uhd"] for i in reversed(IMAGES)]
+
+
+def seed(r):
+    post_to_redis.publish_images(r, IMAGES)
+    # 索引不为空时不读取旧的 wallpapers 集合
+    r.sadd("wallpapers", "https://example.com/legacy.jpg")
+
+
+def test_list_is_date_order(r, call_images):
+    seed(r)
+    for sort in (None, 'date', 'unknown'):
+        path = '/api/images' + ('?sort=' + sort if sort else '')
+        status, body, _ = call_images(path)
+        assert status == 200
+        assert body["images"] == BY_DATE
+        assert body["sort"] == 'date'
+    _, body, _ = call_images('/api/images?sort=reverse')
+    assert body["images"] == BY_DATE[::-1]
+
+
+def test_alphabetical_sorts_by_url(r, call_images):
+    seed(r)
+    _, body, _ = call_images('/api/images?sort=alphabetical')
+    assert body["sort"] == 'alphabetical'
+    assert body["images"] == sorted(BY_DATE) != BY_DATE
+    _, page, _ = call_images('/api/images?sort=alphabetical&offset=1&limit=1')
+    assert page["total"] == 3 and page["images"] == sorted(BY_DATE)[1:2]
+    _, first, _ = call_images('/api/images/position/0?sort=alphabetical')
+    assert first["image"] == sorted(BY_DATE)[0]
+
+
+def test_all_list_paths_share_the_index(r, call_images):
+    seed(r)
+    _, page, _ = call_images('/api/images?offset=0&limit=2')
+    assert page["total"] == 3
+    assert page["images"] == BY_DATE[:2]
+
+    _, random_page, _ = call_images('/api/images?sort=random&limit=10')
+    assert random_page["total"] == 3
+    assert sorted(random_page["images"]) == sorted(BY_DATE)
+
+    _, random_list, _ = call_images('/api/images?sort=random')
+    assert sorted(random_list["images"]) == sorted(BY_DATE)
+
+    cursor, seen = 0, []
+    while True:
+        _, body, _ = call_images('/api/images?cursor={}&limit=1'.format(cursor))
+        seen.extend(body["images"])
+        cursor = int(body["cursor"])
+        if cursor == 0:
+            break
+    assert sorted(seen) == sorted(BY_DATE)
+
+    status, _, headers = call_images('/api/images?format=image')
+    assert status == 308
+    assert headers['Location'] in BY_DATE
+
+
+def test_latest_and_position(r, call_images):
+    seed(r)
+    _, latest, _ = call_images('/api/images/latest')
+    assert latest["image"] == BY_DATE[-1]
+    assert latest["total"] == 3
+    _, first, _ = call_images('/api/images/position/0')
+    assert first["image"] == BY_DATE[0]
+    _, last, _ = call_images('/api/images/position/-1')
+    assert last["image"] == latest["image"]
+    assert last["position"] == 2
+    _, newest_first, _ = call_images('/api/images/position/0?sort=reverse')
+    assert newest_first["image"] == BY_DATE[-1]
+    status, body, _ = call_images('/api/images/position/3')
+    assert status == 400
+    assert body["available_positions"] == 3
+
+
+def test_legacy_set_until_index_is_populated(r, call_images):
+    legacy = ["https://example.com/b.jpg", "https://example.com/a.jpg", "https://example.com/c.jpg"]
+    r.sadd("wallpapers", *legacy)
+    _, body, _ = call_images('/api/images')
+    assert body["images"] == sorted(legacy)
+    _, page, _ = call_images('/api/images?sort=reverse&offset=0&limit=2')
+    assert page["total"] == 3 and page["images"] == sorted(legacy, reverse=True)[:2]
+    _, latest, _ = call_images('/api/images/latest')
+    assert latest["image"] == sorted(legacy)[-1]
+    _, cursor_page, _ = call_images('/api/images?cursor=0&limit=10')
+    assert sorted(cursor_page["images"]) == sorted(legacy)
+    status, _, headers = call_images('/api/images?format=image')
+    assert status == 308 and headers['Location'] in legacy
+    _, today, _ = call_images('/api/images/today')
+    assert today["image"] in legacy
+
+    # 回填写入索引后（数据版本变化）切换到索引
+    seed(r)
+    _, body, _ = call_images('/api/images')
+    assert body["images"] == BY_DATE
+
+
+def random_redirect(redis_server, monkeypatch):
+    """以 api/_app.py 的首页路由处理一次随机跳转，返回 Location"""
+    import redis.asyncio
+
+    import _app
+
+    async def run():
+        client = redis.asyncio.Redis(port=redis_server, decode_responses=True)
+        monkeypatch.setattr(_app, 'get_async_redis_client', lambda: client)
+        try:
+            return await _app.route_index('/random', {})
+        finally:
+            await client.close()
+
+    response = asyncio.run(run())
+    return response.status, dict(response.headers).get('Location')
+
+
+def test_random_uses_stored_urls(r, redis_server, monkeypatch):
+    assert random_redirect(redis_server, monkeypatch)[0] == 500
+    r.sadd("wallpapers", "https://example.com/legacy.jpg")
+    assert random_redirect(redis_server, monkeypatch) == (308, "https://example.com/legacy.jpg")
+    # 索引中是入库时算好的 4K 地址，原样跳转
+    seed(r)
+    status, location = random_redirect(redis_server, monkeypatch)
+    assert status == 308 and location in BY_DATE
+
+
+def test_empty(r, call_images):
+    assert call_images('/api/images/latest')[0] == 404
+    assert call_images('/api/images/position/0')[0] == 404
+    _, body, _ = call_images('/api/images?limit=10')
+    assert body["total"] == 0 and body["images"] == []
+
+
+def test_unknown_path_skips_data_version(r, call_images, monkeypatch):
+    import _app
+
+    async def fail(client):
+        raise AssertionError("未知路径不应读取数据版本")
+    monkeypatch.setattr(_app, 'get_data_version', fail)
+    status, body, headers = call_images('/api/images/unknown')
+    assert status == 404 and body["message"] == "接口不存在"
+    assert 'ETag' not in headers
@@ -0,0 +1,91 @@
+# tests/test_api_search.py
+# /api/images/search：多个词和指定地区都在服务端求交集，只取当前页
+import post_to_redis
+import wallpaper_index
+from conftest import stored_image
+
+ZH = [
+    stored_image("20251103", "Squirrel", title="松鼠的冬天", copyright="森林里的松鼠 (© A)"),
+    stored_image("20251102", "Park", title="国家公园", copyright="黄石国家公园 (© B)"),
+    stored_image("20251101", "Fox", title="狐狸", copyright="雪地里的狐狸 (© C)"),
+]
+EN = [
+    stored_image("20251103", "Squirrel", market="en-US", title="Winter squirrel", copyright="Red squirrel, national park (© A)"),
+    stored_image("20251102", "Park", market="en-US", title="National park", copyright="Yellowstone National Park (© B)"),
+    stored_image("20251101", "Fox", market="en-US", title="Arctic fox", copyright="A fox in the snow (© C)"),
+]
+
+
+def seed(r):
+    post_to_redis.index_images(r, "zh-CN", ZH)
+    post_to_redis.index_images(r, "en-US", EN)
+
+
+def ids(body):
+    return [image["id"] for image in body["images"]]
+
+
+def test_single_token_pages(r, call_images):
+    seed(r)
+    status, body, _ = call_images('/api/images/search?q=park&limit=1')
+    assert status == 200
+    assert body["total"] == 2
+    assert ids(body) == ["en-US:20251103"]
+    assert body["next_offset"] == 1
+    _, body, _ = call_images('/api/images/search?q=park&offset=1&limit=1')
+    assert ids(body) == ["en-US:20251102"]
+    assert body["next_offset"] is None
+
+
+def test_tokens_and_market_are_intersected(r, call_images):
+    seed(r)
+    _, body, _ = call_images('/api/images/search?q=national+park')
+    assert ids(body) == ["en-US:20251103", "en-US:20251102"]
+    _, body, _ = call_images('/api/images/search?q=国家公园')
+    assert ids(body) == ["zh-CN:20251102"]
+    assert body["images"][0]["title"] == "国家公园"
+
+    _, body, _ = call_images('/api/images/search?q=fox&mkt=en-US')
+    assert body["total"] == 1 and ids(body) == ["en-US:20251101"]
+    _, body, _ = call_images('/api/images/search?q=fox&mkt=zh-CN')
+    assert body["total"] == 0 and body["images"] == []
+    _, body, _ = call_images('/api/images/search?q=national+park&mkt=en-US&offset=1&limit=1')
+    assert body["total"] == 2 and ids(body) == ["en-US:20251102"]
+
+    # 交集的临时结果不会留在 Redis 中
+    assert not list(r.scan_iter(match='search:q:*'))
+
+
+def test_format_image_redirects_to_newest(r, call_images):
+    seed(r)
+    status, _, headers = call_images('/api/images/search?q=狐狸&format=image')
+    assert status == 308
+    assert headers['Location'] == ZH[2]["uhd"]
+    assert call_images('/api/images/search?q=zebra&format=image')[0] == 404
+
+
+def test_query_errors(r, call_images):
+    seed(r)
+    status, body, _ = call_images('/api/images/search')
+    assert status == 400 and body["message"] == "缺少搜索词 q"
+    status, body, _ = call_images('/api/images/search?q=a')
+    assert status == 400 and body["message"] != "缺少搜索词 q"
+    assert "太短" in body["message"]
+    assert call_images('/api/images/search?q=park&limit=0')[0] == 400
+
+
+def test_tokenizer_is_shared_with_ingest():
+    assert wallpaper_index.tokenize("National Park, A") == ["national", "park"]
+    assert wallpaper_index.tokenize("国家公园") == ["国", "家", "公", "园", "国家", "家公", "公园"]
+    assert wallpaper_index.tokenize("国家公园", query=True) == ["国家", "家公", "公园"]
+
+
+def test_index_failures_are_counted_per_batch(r, capsys):
+    # 占用一个词的键，让这一批的 ZADD 报 WRONGTYPE
+    r.set(wallpaper_index.SEARCH_TOKEN_PREFIX + "fox", "not a zset")
+    added, errors = post_to_redis.index_images(r, "en-US", EN, batch_size=2)
+    assert errors == 1
+    assert added == 3
+    assert "索引写入失败" in capsys.readouterr().out
+    # 其他批次照常写入
+    assert r.zscore(wallpaper_index.date_index_key("en-US"), "en-US:20251103") == 20251103
@@ -0,0 +1,36 @@
+# tests/test_asgi.py
+# ASGI 入口：HEAD 与 GET 的响应头相同（包括 Content-Length），但不发送响应体
+import asyncio
+
+import asgi
+
+
+def request(method, path):
+    """:return: (状态码, 响应头 dict, 拼接后的响应体)"""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': []}
+    asyncio.run(asgi.app(scope, receive, send))
+    start = messages[0]
+    body = b''.join(message['body'] for message in messages[1:])
+    return start['status'], dict(start['headers']), body
+
+
+def test_head_sends_headers_only():
+    status, headers, body = request('GET', '/')
+    assert status == 200 and int(headers[b'content-length']) == len(body) > 0
+
+    head_status, head_headers, head_body = request('HEAD', '/')
+    assert head_status == 200 and head_body == b''
+    assert head_headers == headers
+
+
+def test_other_methods_are_rejected():
+    status, headers, _ = request('POST', '/')
+    assert status == 405 and headers[b'allow'] == b'GET, HEAD'
@@ -0,0 +1,73 @@
+# tests/test_clear_data.py
+# clear_data.py 只备份被删除或确实改写的文件
+import json
+import os
+
+import pytest
+
+import clear_data
+import history_store
+import main
+from conftest import make_image
+
+
+@pytest.fixture
+def workspace(data_dir, monkeypatch):
+    """在临时目录中运行（备份写入当前目录下的 bak/）"""
+    monkeypatch.chdir(data_dir.parent)
+    return data_dir
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def backups(workspace):
+    bak = workspace.parent / 'bak'
+    return sorted(p.name for p in bak.rglob('*.bak')) if bak.exists() else []
+
+
+def seed(workspace):
+    old, new = make_image("20250101", "Old"), make_image("20250601", "New")
+    # 只有 zh-CN 有早于目标日期的记录
+    write_json(workspace / 'zh-CN_all.json', {"Total": 2, "data": [new, old]})
+    write_json(workspace / 'en-US_all.json', {"Total": 1, "data": [new]})
+    write_json(workspace / 'zh-CN_update.json', {"images": [new, old]})
+    write_json(workspace / 'en-US_update.json', {"images": [new]})
+    main.store_new_images("zh-CN", [new, old])
+    main.store_new_images("en-US", [make_image("20250601", "New", market="en-US")])
+    (workspace / 'zh-CN_2025-01-02_10-00-00.json').write_text('{}')
+    (workspace / 'zh-CN_2025-06-02_10-00-00.json').write_text('{}')
+
+
+def test_only_changed_or_deleted_files_are_backed_up(workspace):
+    seed(workspace)
+    unchanged = (workspace / 'en-US_all.json').read_bytes()
+    original = (workspace / 'zh-CN_all.json').read_bytes()
+
+    assert clear_data.clear_data_before_date('2025-03-01', str(workspace), workers=1)
+
+    assert backups(workspace) == sorted([
+        'zh-CN_all.json.bak', 'zh-CN_update.json.bak', 'zh-CN_history.jsonl.bak', 'zh-CN_history.json.bak',
+        'zh-CN_2025-01-02_10-00-00.json.bak',
+    ])
+    assert (workspace.parent / 'bak' / 'zh-CN_all.json.bak').read_bytes() == original
+    assert (workspace / 'en-US_all.json').read_bytes() == unchanged
+    assert json.loads((workspace / 'zh-CN_all.json').read_text())["Total"] == 1
+    assert history_store.read_header("zh-CN")["Total"] == 1
+
+
+def test_dry_run_backs_up_nothing(workspace):
+    seed(workspace)
+    before = {p.name: p.read_bytes() for p in workspace.iterdir() if p.is_file()}
+    assert clear_data.clear_data_before_date('2025-03-01', str(workspace), workers=1, dry_run=True)
+    assert backups(workspace) == []
+    assert {p.name: p.read_bytes() for p in workspace.iterdir() if p.is_file()} == before
+
+
+def test_no_backup_flag(workspace):
+    seed(workspace)
+    assert clear_data.clear_data_before_date('2025-03-01', str(workspace), backup=False, workers=1)
+    assert backups(workspace) == []
+    assert not os.path.exists(workspace / 'zh-CN_2025-01-02_10-00-00.json')
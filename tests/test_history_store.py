@@ -0,0 +1,115 @@
+# tests/test_history_store.py
+# 追加写入的历史存储：每天只追加新记录，有新记录时增量导出 _all.json
+import json
+
+import ALL
+import compact_archive
+import history_store
+import image_urls
+import main
+import make_readme
+from conftest import make_image
+
+
+def read_all_json(run_type):
+    with open(history_store.all_json_path(run_type), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_bytes(run_type):
+    with open(history_store.all_json_path(run_type), 'rb') as f:
+        return f.read()
+
+
+def test_daily_run_exports_new_records(data_dir):
+    main.store_new_images("zh-CN", [make_image("20251102", "Apple"), make_image("20251101", "Mango")])
+    ALL.export_views("zh-CN")
+    assert read_all_json("zh-CN")["Total"] == 2
+
+    main.store_new_images("zh-CN", [make_image("20251104", "Zebra"), make_image("20251103", "Otter")])
+    ALL.export_views("zh-CN")
+    incremental = read_bytes("zh-CN")
+    assert [i["startdate"] for i in read_all_json("zh-CN")["data"]] == ["20251104", "20251103", "20251102", "20251101"]
+    with compact_archive.CompactArchive.open("zh-CN") as archive:
+        assert len(archive) == 4
+    assert history_store.unexported_images("zh-CN", 'archive') == []
+
+    # 增量导出与全量导出的结果逐字节相同
+    history_store.export_all_json("zh-CN", full=True)
+    assert read_bytes("zh-CN") == incremental
+
+    _, latest = make_readme.read_days(["zh-CN"])
+    assert latest["startdate"] == "20251104"
+    assert latest["uhd"].endswith("OHR.Zebra_ZH-CN1234_UHD.jpg")
+
+
+def test_urls_are_computed_once_at_ingest(data_dir, monkeypatch):
+    main.store_new_images("zh-CN", [make_image("20251101", "Mango")])
+    stored = next(history_store.iter_images("zh-CN"))
+    assert stored["uhd"] == "https://www.bing.com/th?id=OHR.Mango_ZH-CN1234_UHD.jpg"
+    assert stored["thumb"].startswith(stored["uhd"] + "&")
+
+    # 之后的导出和 README 都读取日志中的地址，不再计算
+    def fail(urlbase):
+        raise AssertionError("地址应在入库时算好")
+    monkeypatch.setattr(image_urls, 'resolve_urls', fail)
+    ALL.export_views("zh-CN")
+    with compact_archive.CompactArchive.open("zh-CN") as archive:
+        assert archive[0]["uhd"] == stored["uhd"]
+    assert make_readme.read_days(["zh-CN"])[1]["thumb"] == stored["thumb"]
+    # _all.json 保持原来的字段
+    assert set(read_all_json("zh-CN")["data"][0]) == set(make_image("20251101", "Mango"))
+
+
+def test_no_new_records_skips_export(data_dir):
+    main.store_new_images("zh-CN", [make_image("20251101", "Mango")])
+    ALL.export_views("zh-CN")
+    before = read_bytes("zh-CN")
+    main.store_new_images("zh-CN", [make_image("20251101", "Mango")])
+    assert not history_store.export_due("zh-CN", 'all_json', history_store.all_json_path("zh-CN"))
+    assert not history_store.export_due("zh-CN", 'archive', compact_archive.archive_path("zh-CN"))
+    ALL.export_views("zh-CN")
+    assert read_bytes("zh-CN") == before
+
+
+def test_older_records_fall_back_to_full_export(data_dir):
+    main.store_new_images("zh-CN", [make_image("20251103", "Zebra")])
+    ALL.export_views("zh-CN")
+    # 补抓到更早的记录，不能拼在开头
+    main.store_new_images("zh-CN", [make_image("20251101", "Mango")])
+    assert history_store.export_all_json("zh-CN") is not None
+    assert [i["startdate"] for i in read_all_json("zh-CN")["data"]] == ["20251103", "20251101"]
+    ALL.export_views("zh-CN")
+    with compact_archive.CompactArchive.open("zh-CN") as archive:
+        assert archive[1]["startdate"] == "20251101"
+
+
+def test_known_keys_match_startdate():
+    keys = history_store.KnownKeys()
+    keys.add("20251101", "aaa")
+    keys.add("20251102", "")
+    assert {"startdate": "20251101", "hsh": "aaa"} in keys
+    # 同一天重新发布（hsh 不同）仍算已存在，只作提示
+    assert {"startdate": "20251101", "hsh": "bbb"} in keys
+    assert keys.republished({"startdate": "20251101", "hsh": "bbb"})
+    assert not keys.republished({"startdate": "20251101", "hsh": "aaa"})
+    assert not keys.republished({"startdate": "20251102", "hsh": "ccc"})
+    assert {"startdate": "20251103", "hsh": "aaa"} not in keys
+    assert len(keys) == 2
+
+
+def test_store_skips_known_images(data_dir, capsys):
+    first = [make_image("20251102", "Apple"), make_image("20251101", "Mango")]
+    assert len(main.store_new_images("zh-CN", first)) == 2
+    # 窗口重叠且顺序不同：只有新的一天入库
+    window = [make_image("20251101", "Mango"), make_image("20251103", "Zebra"), make_image("20251102", "Apple")]
+    assert [i["startdate"] for i in main.store_new_images("zh-CN", window)] == ["20251103"]
+    # 同一天换了图片：每天只保留一条，doc id 和日期索引不会被两条记录共用
+    capsys.readouterr()
+    republished = make_image("20251103", "Otter", hsh="new-hsh")
+    assert main.store_new_images("zh-CN", [republished]) == []
+    assert "重新发布" in capsys.readouterr().out
+    assert [i["title"] for i in history_store.load_images("zh-CN")] == ["Zebra", "Apple", "Mango"]
+
+    keys = history_store.load_known_keys("zh-CN")
+    assert len(keys) == history_store.read_header("zh-CN")["Total"] == 3
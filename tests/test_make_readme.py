@@ -0,0 +1,44 @@
+# tests/test_make_readme.py
+# README 表格按 enddate 对齐各地区，地区没有记录时不出错
+import pytest
+
+import main
+import make_readme
+from conftest import make_image
+
+
+@pytest.fixture
+def readme_dir(data_dir, monkeypatch):
+    monkeypatch.setattr(make_readme, 'README_PATH', str(data_dir.parent / 'README.md'))
+    monkeypatch.setattr(make_readme, 'ARCHIVE_DIR', str(data_dir.parent / 'archive'))
+    return data_dir.parent
+
+
+def test_rows_are_paired_by_enddate(readme_dir):
+    main.store_new_images("zh-CN", [make_image("20251102", "Apple"), make_image("20251101", "Mango")])
+    # en-US 晚一天更新，缺少 11-02
+    main.store_new_images("en-US", [make_image("20251101", "Mango", market="en-US")])
+    make_readme.main(["zh-CN", "en-US"], full=True)
+
+    days, latest = make_readme.read_days(["zh-CN", "en-US"])
+    assert sorted(days["20251103"]) == ["zh-CN"]
+    assert sorted(days["20251102"]) == ["en-US", "zh-CN"]
+    content = (readme_dir / 'README.md').read_text(encoding='utf-8')
+    assert "Today: [Apple]" in content
+    row = next(line for line in content.splitlines() if "![2025-11-02]" in line)
+    assert "ZH-CN" in row and "EN-US" in row
+
+
+def test_empty_first_market(readme_dir):
+    main.store_new_images("zh-CN", [])
+    main.store_new_images("en-US", [make_image("20251101", "Mango", market="en-US")])
+    make_readme.main(["zh-CN", "en-US"], full=True)
+    assert "Today: [Mango]" in (readme_dir / 'README.md').read_text(encoding='utf-8')
+
+
+def test_no_records_at_all(readme_dir):
+    main.store_new_images("zh-CN", [])
+    make_readme.main(["zh-CN"], full=True)
+    content = (readme_dir / 'README.md').read_text(encoding='utf-8')
+    assert content.startswith("# Bing Wallpaper\n")
+    assert "Today:" not in content
@@ -0,0 +1,46 @@
+# tests/test_today.py
+# 每日壁纸在 ingest 时预选：只由 ingest 写入的 Redis 中也能选出，API 直接读取预选的结果
+import os
+from datetime import datetime, timedelta
+
+import main
+import post_to_redis
+from conftest import make_image, stored_image
+
+
+def today_key(offset=0):
+    return "wallpaper:today:{}".format((datetime.now() + timedelta(days=offset)).strftime('%Y-%m-%d'))
+
+
+def ingest(data_dir, r, images, run_type="zh-CN"):
+    """模拟 ALL.run 中一个地区的处理：写入历史存储后发布到 Redis"""
+    os.makedirs(os.path.join(str(data_dir), f'{run_type}_daily_log'), exist_ok=True)
+    main.main(run_type, {"images": images})
+    post_to_redis.main(run_type, r)
+
+
+def test_ingest_schedules_today(data_dir, r, call_images):
+    images = [make_image("20251103", "Zebra"), make_image("20251102", "Apple")]
+    ingest(data_dir, r, images)
+
+    indexed = set(r.zrange(post_to_redis.WALLPAPER_INDEX, 0, -1))
+    for offset in range(post_to_redis.TODAY_PRECOMPUTE_DAYS):
+        assert r.get(today_key(offset)) in indexed
+    assert r.ttl(today_key()) > 86400
+
+    status, body, _ = call_images('/api/images/today')
+    assert status == 200
+    assert body["image"] == r.get(today_key())
+
+
+def test_schedule_keeps_existing_pick(r):
+    post_to_redis.publish_images(r, [stored_image("20251103", "Zebra"), stored_image("20251102", "Apple")])
+    r.set(today_key(), "picked-by-api")
+    assert post_to_redis.schedule_today_wallpapers(r, 2) == 1
+    assert r.get(today_key()) == "picked-by-api"
+    assert r.exists(today_key(1))
+
+
+def test_schedule_with_empty_index(r):
+    assert post_to_redis.schedule_today_wallpapers(r) == 0
+    assert not r.keys("wallpaper:today:*")
@@ -0,0 +1,88 @@
+# coding:utf-8
+# Redis 中壁纸索引的键名和分词规则：post_to_redis 写入，api/ 下的接口读取，两边都从这里导入
+#
+# 搜索：每个词一个 ZSET（search:t:{词}），成员为图片 id（{地区}:{startdate}），score 为 startdate，
+# 即按日期排好序的倒排列表。按日期查询：ZSET wallpapers:dates（所有地区）和 wallpapers:dates:{地区}，
+# 成员和 score 与搜索相同。图片的标题、版权信息和 4K 地址保存在 HASH wallpapers:meta 中。
+import json
+import re
+import unicodedata
+
+# 按 startdate 排序的壁纸索引（ZSET），所有列表、位置、随机和今日壁纸都从这里读取
+WALLPAPER_INDEX = "wallpapers:index"
+# 数据版本，有新图片写入时 INCR，api/_cache.py 据此让进程内缓存失效
+DATA_VERSION_KEY = "wallpapers:version"
+SEARCH_TOKEN_PREFIX = "search:t:"
+IMAGE_META = "wallpapers:meta"
+DATE_INDEX = "wallpapers:dates"
+
+# 中日文字符（平假名、片假名、CJK 统一表意文字及扩展 A、兼容表意文字）：没有空格分词，按单字和相邻两字切分
+CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+WORD_RUN = re.compile(r'[^\W_]+')
+
+
+def doc_id(market, startdate):
+    return "{}:{}".format(market, startdate)
+
+
+def date_index_key(market=None):
+    return "{}:{}".format(DATE_INDEX, market) if market else DATE_INDEX
+
+
+def _split_run(run, query):
+    """把一段连续的字母数字切成词：中日文部分取单字和二元组，其余部分整体作为一个词"""
+    tokens = []
+    position = 0
+    for match in CJK_RUN.finditer(run):
+        if match.start() > position:
+            tokens.append(run[position:match.start()])
+        cjk = match.group()
+        bigrams = [cjk[i:i + 2] for i in range(len(cjk) - 1)]
+        # 查询时只要有二元组就够了（包含二元组的图片一定包含其中的单字），索引时两者都写入
+        if query and bigrams:
+            tokens.extend(bigrams)
+        else:
+            tokens.extend(cjk)
+            tokens.extend(bigrams)
+        position = match.end()
+    if position < len(run):
+        tokens.append(run[position:])
+    return tokens
+
+
+def tokenize(text, query=False):
+    """
+    分词：NFKC 规范化并转小写，按非字母数字字符切分，中日文按单字 + 二元组切分；
+    非中日文的单个字母不作为词（数字保留）
+
+    :param query: 查询时中日文只取二元组
+    :return: 去重后的词列表，保持出现顺序
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    tokens = []
+    for run in WORD_RUN.findall(text):
+        tokens.extend(_split_run(run, query))
+    seen = set()
+    result = []
+    for token in tokens:
+        if token in seen or (len(token) == 1 and token.isascii() and not token.isdigit()):
+            continue
+        seen.add(token)
+        result.append(token)
+    return result
+
+
+def image_tokens(item):
+    return tokenize((item.get("title") or "") + " " + (item.get("copyright") or ""))
+
+
+def image_meta(market, item, url):
+    return json.dumps({
+        "id": doc_id(market, item["startdate"]),
+        "market": market,
+        "date": item["startdate"],
+        "fullstartdate": item.get("fullstartdate") or "",
+        "title": item.get("title") or "",
+        "copyright": item.get("copyright") or "",
+        "url": url,
+    }, ensure_ascii=False, separators=(',', ':'))